@@ -1,7 +1,12 @@
-from sqlalchemy import create_engine
-from sqlalchemy.orm import declarative_base, sessionmaker
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.orm import declarative_base, sessionmaker, Session
+from sqlalchemy.sql.dml import UpdateBase
 from dotenv import load_dotenv
+import itertools
+import logging
 import os
+import threading
+import time
 
 load_dotenv()
 
@@ -11,10 +16,117 @@ DB_HOST = os.getenv("DB_HOST")
 DB_PORT = os.getenv("DB_PORT", 3306)
 DB_NAME = os.getenv("DB_NAME")
 
-DATABASE_URL = f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
+# Read replicas as "host[:port]" entries, e.g. DB_REPLICA_HOSTS=127.0.0.1:3307,127.0.0.1:3308
+# (same user, password and database as the primary). Unset means everything uses the primary.
+DB_REPLICA_HOSTS = [host.strip() for host in os.getenv("DB_REPLICA_HOSTS", "").split(",") if host.strip()]
+# After a client's write, its reads stay on the primary this long so it sees its own change
+READ_YOUR_WRITES_SECONDS = float(os.getenv("DB_READ_YOUR_WRITES_SECONDS", 5))
+REPLICA_CHECK_SECONDS = float(os.getenv("DB_REPLICA_CHECK_SECONDS", 5))
+# Replicas further behind than this are skipped; unset disables the lag check
+REPLICA_MAX_LAG_SECONDS = os.getenv("DB_REPLICA_MAX_LAG_SECONDS")
+
+logger = logging.getLogger(__name__)
+
+
+def database_url(host, port):
+    return f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{host}:{port}/{DB_NAME}?charset=utf8mb4"
+
+
+DATABASE_URL = database_url(DB_HOST, DB_PORT)
 
 engine = create_engine(DATABASE_URL, echo=True)
-SessionLocal = sessionmaker(bind=engine)
+
+
+class ReplicaPool:
+    """Round-robin over the replicas that passed their last health check."""
+
+    def __init__(self, engines):
+        self.engines = engines
+        self.healthy = {replica: True for replica in engines}
+        self._next = itertools.cycle(engines)
+        self._lock = threading.Lock()
+        self._checker = None
+        for replica in engines:
+            event.listen(replica, "handle_error", self._on_error)
+
+    def pick(self):
+        """A healthy replica, or None to fall back to the primary."""
+        self._start_checker()
+        with self._lock:
+            for _ in range(len(self.engines)):
+                replica = next(self._next)
+                if self.healthy[replica]:
+                    return replica
+        return None
+
+    def mark(self, replica, healthy):
+        with self._lock:
+            if self.healthy[replica] != healthy:
+                logger.warning("Replica %s is now %s", replica.url.host, "healthy" if healthy else "down")
+            self.healthy[replica] = healthy
+
+    def _on_error(self, context):
+        # A dropped or refused connection takes the replica out until the checker sees it back
+        if context.is_disconnect and context.engine is not None:
+            self.mark(context.engine, False)
+
+    def check(self):
+        for replica in self.engines:
+            try:
+                with replica.connect() as connection:
+                    connection.execute(text("SELECT 1"))
+                    healthy = True
+                    if REPLICA_MAX_LAG_SECONDS is not None:
+                        status = connection.execute(text("SHOW SLAVE STATUS")).mappings().first()
+                        lag = status and status.get("Seconds_Behind_Master")
+                        healthy = lag is not None and lag <= float(REPLICA_MAX_LAG_SECONDS)
+            except Exception:
+                healthy = False
+            self.mark(replica, healthy)
+
+    def _start_checker(self):
+        if self._checker is not None:
+            return
+        with self._lock:
+            if self._checker is None:
+                self._checker = threading.Thread(target=self._check_forever, daemon=True)
+                self._checker.start()
+
+    def _check_forever(self):
+        while True:
+            self.check()
+            time.sleep(REPLICA_CHECK_SECONDS)
+
+
+def _replica_engine(entry):
+    host, _, port = entry.partition(":")
+    return create_engine(database_url(host, port or 3306), echo=True, pool_pre_ping=True)
+
+
+replicas = ReplicaPool([_replica_engine(entry) for entry in DB_REPLICA_HOSTS])
+
+
+class RoutingSession(Session):
+    """Sends reads to a replica and everything else to the primary.
+
+    Flushes and INSERT/UPDATE/DELETE statements always use the primary. Once a session has
+    written, or when info["primary"] is set (mutations, read-your-writes), its reads do too.
+    """
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if self._flushing or isinstance(clause, UpdateBase):
+            self.info["wrote"] = True
+            return engine
+        if self.info.get("wrote") or self.info.get("primary") or not replicas.engines:
+            return engine
+        replica = self.info.get("replica")
+        if replica is None or (replica is not engine and not replicas.healthy[replica]):
+            # One replica per session, so a request sees a single consistent snapshot
+            replica = self.info["replica"] = replicas.pick() or engine
+        return replica
+
+
+SessionLocal = sessionmaker(class_=RoutingSession)
 
 Base = declarative_base()
 def get_db():
@@ -22,4 +134,4 @@ def get_db():
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
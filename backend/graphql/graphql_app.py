@@ -5,7 +5,16 @@ from backend.graphql.resolvers import (
     player_weekly_stats_resolvers,
     player_yearly_stats_resolvers,
     team_weekly_stats_resolvers,
-    team_yearly_stats_resolvers
+    team_yearly_stats_resolvers,
+    rolling_stats_resolvers,
+    scoring_resolvers,
+    similarity_resolvers,
+    projection_resolvers,
+    lineup_optimizer_resolvers,
+    player_search_resolvers,
+    game_resolvers,
+    defense_vs_position_resolvers,
+    percentile_resolvers
 )
 
 schema = make_executable_schema(
@@ -21,5 +30,16 @@ schema = make_executable_schema(
     team_weekly_stats_resolvers.query,
     team_weekly_stats_resolvers.mutation,
     team_yearly_stats_resolvers.query,
-    team_yearly_stats_resolvers.mutation
+    team_yearly_stats_resolvers.mutation,
+    rolling_stats_resolvers.query,
+    scoring_resolvers.query,
+    scoring_resolvers.mutation,
+    scoring_resolvers.player_weekly_stats,
+    similarity_resolvers.query,
+    projection_resolvers.query,
+    lineup_optimizer_resolvers.mutation,
+    player_search_resolvers.query,
+    game_resolvers.query,
+    defense_vs_position_resolvers.query,
+    percentile_resolvers.query
 )
\ No newline at end of file
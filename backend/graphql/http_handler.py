@@ -0,0 +1,292 @@
+import asyncio
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from functools import cached_property, lru_cache
+from inspect import isawaitable
+
+from ariadne.asgi.handlers import GraphQLHTTPHandler
+from ariadne.exceptions import HttpError
+from graphql import (
+    BREAK,
+    DirectiveNode,
+    ExperimentalIncrementalExecutionResults,
+    FieldNode,
+    FragmentSpreadNode,
+    GraphQLDeferDirective,
+    GraphQLError,
+    GraphQLSchema,
+    GraphQLStreamDirective,
+    InlineFragmentNode,
+    OperationType,
+    Visitor,
+    experimental_execute_incrementally,
+    get_operation_ast,
+    parse,
+    print_ast,
+    validate,
+    visit,
+)
+from starlette.responses import JSONResponse, PlainTextResponse, Response, StreamingResponse
+
+from backend.db import SessionLocal
+from backend.services.data_versions import etag_for
+from backend.services.single_flight import SingleFlight
+
+query_flight = SingleFlight()
+
+# Shared caches (a CDN) may serve a read this long before revalidating it with If-None-Match
+CACHE_MAX_AGE = int(os.getenv("GRAPHQL_CACHE_MAX_AGE", 60))
+CACHE_CONTROL = f"public, max-age=0, s-maxage={CACHE_MAX_AGE}, stale-while-revalidate={CACHE_MAX_AGE}"
+# Most operations accepted in one batched (JSON array) request
+MAX_BATCH_SIZE = int(os.getenv("GRAPHQL_MAX_BATCH_SIZE", 20))
+INCREMENTAL_DIRECTIVES = {"defer", "stream"}
+MULTIPART_CONTENT_TYPE = 'multipart/mixed; boundary="-"'
+PART_HEADER = b"\r\n---\r\nContent-Type: application/json; charset=utf-8\r\n\r\n"
+MULTIPART_END = b"\r\n-----\r\n"
+
+
+@lru_cache(maxsize=1024)
+def _parsed(query):
+    document = parse(query)
+    return document, print_ast(document)
+
+
+def read_operation(data):
+    """(operation, document, key) for a read-only operation, or None if it is anything else.
+
+    The key covers the document printed back from its AST, so whitespace, comments and
+    formatting do not split otherwise identical queries, plus the operation name and
+    variables.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get("query"), str):
+        return None
+    try:
+        document, normalized = _parsed(data["query"])
+    except GraphQLError:
+        return None
+    operation = get_operation_ast(document, data.get("operationName"))
+    if operation is None or operation.operation != OperationType.QUERY:
+        return None
+    variables = json.dumps(data.get("variables") or {}, sort_keys=True, default=str)
+    payload = "\0".join([normalized, data.get("operationName") or "", variables])
+    return operation, document, hashlib.sha1(payload.encode()).hexdigest()
+
+
+def root_fields(operation, document):
+    fragments = {
+        definition.name.value: definition
+        for definition in document.definitions
+        if definition.kind == "fragment_definition"
+    }
+    fields = set()
+
+    def collect(selection_set):
+        for selection in selection_set.selections:
+            if isinstance(selection, FieldNode):
+                fields.add(selection.name.value)
+            elif isinstance(selection, InlineFragmentNode):
+                collect(selection.selection_set)
+            elif isinstance(selection, FragmentSpreadNode) and selection.name.value in fragments:
+                collect(fragments[selection.name.value].selection_set)
+
+    collect(operation.selection_set)
+    return fields
+
+
+class _IncrementalDirectiveFinder(Visitor):
+    found = False
+
+    def enter_directive(self, node: DirectiveNode, *_):
+        if node.name.value in INCREMENTAL_DIRECTIVES:
+            self.found = True
+            return BREAK
+        return None
+
+
+def uses_incremental_delivery(document):
+    finder = _IncrementalDirectiveFinder()
+    visit(document, finder)
+    return finder.found
+
+
+def _multipart_part(payload):
+    return PART_HEADER + json.dumps(payload, default=str).encode()
+
+
+class _ResolveInThread:
+    """Middleware running bound (non-default) resolvers on one worker thread.
+
+    Keeps the synchronous resolvers' database calls off the event loop, while the single
+    worker still gives the request's session to one thread at a time.
+    """
+
+    def __init__(self, executor):
+        self.executor = executor
+
+    def resolve(self, next_, root, info, **args):
+        if info.parent_type.fields[info.field_name].resolve is None:
+            # Attribute reads stay inline; hopping threads per row field would cost more
+            return next_(root, info, **args)
+        return self._in_thread(next_, root, info, args)
+
+    async def _in_thread(self, next_, root, info, args):
+        loop = asyncio.get_running_loop()
+        result = await loop.run_in_executor(self.executor, lambda: next_(root, info, **args))
+        if isawaitable(result):
+            result = await result
+        return result
+
+
+def _etag_matches(request, etag):
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = [tag.strip() for tag in header.split(",")]
+    return "*" in tags or etag in tags or f"W/{etag}" in tags
+
+
+class CoalescingGraphQLHTTPHandler(GraphQLHTTPHandler):
+    """HTTP handler that runs identical concurrent queries once and shares the result.
+
+    Resolvers are synchronous, so queries run on a worker thread: that keeps the event loop
+    free to accept the identical requests that then join the running execution.
+    Mutations are never coalesced.
+
+    Reads also carry an ETag built from the operation key and the DataVersions of the
+    tables its root fields read; a matching If-None-Match gets a 304 without executing.
+
+    A JSON array of operations is run as a batch and answered with an array of results in
+    the same order.
+
+    Queries using @defer or @stream from clients that accept multipart/mixed are executed
+    incrementally and each payload is flushed as its own part; their resolvers run on a
+    worker thread so the event loop stays free to flush.
+    """
+
+    async def graphql_http_server(self, request):
+        try:
+            data = await self.extract_data_from_request(request)
+        except HttpError:
+            # Let the stock handler produce its error response
+            return await super().graphql_http_server(request)
+        if isinstance(data, list):
+            return await self.graphql_batch_server(request, data)
+        read = read_operation(data)
+        etag = None
+        if read is None:
+            # Mutations read and write on the primary only
+            request.state.db.info["primary"] = True
+        else:
+            operation, document, key = read
+            if uses_incremental_delivery(document) and "multipart/mixed" in request.headers.get("accept", ""):
+                return await self.graphql_incremental_server(request, data, document)
+            etag = etag_for(request.state.db, root_fields(operation, document), key)
+        if etag is None:
+            return await super().graphql_http_server(request)
+
+        headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+        if _etag_matches(request, etag):
+            return Response(status_code=304, headers=headers)
+        success, result = await self.execute_graphql_query(request, data)
+        response = await self.create_json_response(request, result, success)
+        if success and not result.get("errors"):
+            response.headers.update(headers)
+        else:
+            response.headers["Cache-Control"] = "no-store"
+        return response
+
+    @cached_property
+    def incremental_schema(self):
+        # graphql-core only accepts @defer/@stream in a schema run by its incremental
+        # executor, so the stock executor keeps the plain schema
+        directives = (*self.schema.directives, GraphQLDeferDirective, GraphQLStreamDirective)
+        return GraphQLSchema(**{**self.schema.to_kwargs(), "directives": directives})
+
+    async def graphql_incremental_server(self, request, data, document):
+        if validate(self.incremental_schema, document, self.validation_rules):
+            # Let the stock handler report validation errors
+            return await super().graphql_http_server(request)
+        context = await self.get_context_for_request(request, data)
+        executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="graphql-incremental")
+        try:
+            result = experimental_execute_incrementally(
+                self.incremental_schema,
+                document,
+                root_value=self.root_value,
+                context_value=context,
+                variable_values=data.get("variables"),
+                operation_name=data.get("operationName"),
+                middleware=[_ResolveInThread(executor)],
+            )
+            if isawaitable(result):
+                result = await result
+        except BaseException:
+            executor.shutdown(wait=False)
+            raise
+        if not isinstance(result, ExperimentalIncrementalExecutionResults):
+            executor.shutdown(wait=False)
+            # Directives disabled with if: false, or an error before anything was deferred
+            return JSONResponse(result.formatted, headers={"Cache-Control": "no-store"})
+
+        async def parts():
+            try:
+                yield _multipart_part(result.initial_result.formatted)
+                async for payload in result.subsequent_results:
+                    yield _multipart_part(payload.formatted)
+                yield MULTIPART_END
+            finally:
+                executor.shutdown(wait=False)
+
+        return StreamingResponse(
+            parts(), media_type=MULTIPART_CONTENT_TYPE, headers={"Cache-Control": "no-store"}
+        )
+
+    async def graphql_batch_server(self, request, operations):
+        if not operations or len(operations) > MAX_BATCH_SIZE:
+            return PlainTextResponse(
+                f"A batch must contain between 1 and {MAX_BATCH_SIZE} operations", status_code=400
+            )
+
+        if any(read_operation(operation) is None for operation in operations):
+            # Anything that may write runs in order on the request's own session
+            request.state.db.info["primary"] = True
+            results = []
+            for operation in operations:
+                context = await self.get_context_for_request(request, operation)
+                results.append(await self.execute_graphql_query(request, operation, context_value=context))
+        else:
+            # Read-only batches run concurrently, one pooled session per operation; each
+            # operation gets its own loader cache, since cached rows belong to its session
+            primary = request.state.db.info.get("primary", False)
+
+            async def run(operation):
+                db = SessionLocal()
+                db.info["primary"] = primary
+                try:
+                    context = await self.get_context_for_request(request, operation)
+                    context = {**context, "db": db, "loaders": {}}
+                    return await self.execute_graphql_query(request, operation, context_value=context)
+                finally:
+                    db.close()
+
+            results = await asyncio.gather(*(run(operation) for operation in operations))
+        return JSONResponse([result for _, result in results])
+
+    async def execute_graphql_query(self, request, data, *, context_value=None, query_document=None):
+        execute = super().execute_graphql_query
+        read = read_operation(data)
+        if read is None:
+            return await execute(request, data, context_value=context_value, query_document=query_document)
+
+        def run():
+            return asyncio.run(
+                execute(request, data, context_value=context_value, query_document=query_document)
+            )
+
+        key = read[2]
+        if request.state.db.info.get("primary"):
+            # Read-your-writes clients must not share a replica read
+            key += ":primary"
+        return await query_flight.do(key, lambda: asyncio.to_thread(run))
@@ -0,0 +1,15 @@
+def load_by_pk(info, model, **pk):
+    """Session.get through the loader cache of the session serving the operation.
+
+    The cache holds instances of that session, so every operation (including each one of
+    a batched request) gets its own; a row asked for several times within an operation is
+    loaded once.
+    """
+    db = info.context["db"]
+    cache = info.context.get("loaders")
+    if cache is None:
+        return db.get(model, pk)
+    key = (model.__tablename__, tuple(sorted(pk.items())))
+    if key not in cache:
+        cache[key] = db.get(model, pk)
+    return cache[key]
@@ -3,5 +3,14 @@ from . import (
     team_resolvers,
     player_weekly_stats_resolvers,
     player_yearly_stats_resolvers,
-    team_weekly_stats_resolvers
+    team_weekly_stats_resolvers,
+    rolling_stats_resolvers,
+    scoring_resolvers,
+    similarity_resolvers,
+    projection_resolvers,
+    lineup_optimizer_resolvers,
+    player_search_resolvers,
+    game_resolvers,
+    defense_vs_position_resolvers,
+    percentile_resolvers
 )
@@ -0,0 +1,9 @@
+from ariadne import QueryType
+from backend.services.defense_vs_position import defense_vs_position
+
+query = QueryType()
+
+@query.field("defenseVsPosition")
+def resolve_defense_vs_position(_, info, season, week=None, position=None, teamId=None):
+    db = info.context["db"]
+    return defense_vs_position(db, season, week, position, teamId)
@@ -0,0 +1,14 @@
+from ariadne import QueryType
+from backend.services.games import get_game, get_games
+
+query = QueryType()
+
+@query.field("game")
+def resolve_game(_, info, gameId):
+    db = info.context["db"]
+    return get_game(db, gameId)
+
+@query.field("games")
+def resolve_games(_, info, season, week, seasonType=None):
+    db = info.context["db"]
+    return get_games(db, season, week, seasonType)
@@ -0,0 +1,39 @@
+from ariadne import MutationType
+from backend.models.player_weekly_projections import PlayerWeeklyProjections
+from backend.services.lineup_optimizer import optimize_lineups
+
+mutation = MutationType()
+
+@mutation.field("optimizeLineups")
+def resolve_optimize_lineups(_, info, input):
+    if input["n_lineups"] < 1:
+        raise ValueError("n_lineups must be at least 1")
+    if input["workers"] < 1:
+        raise ValueError("workers must be at least 1")
+    players = [dict(player) for player in input["players"]]
+
+    # Players sent without a projection fall back to the stored weekly projection
+    missing = [p["player_id"] for p in players if p.get("projection") is None]
+    if missing and input.get("season") is not None and input.get("week") is not None:
+        db = info.context["db"]
+        projected = dict(
+            db.query(PlayerWeeklyProjections.player_id, PlayerWeeklyProjections.fantasy_points_ppr)
+            .filter_by(season=input["season"], week=input["week"])
+            .filter(PlayerWeeklyProjections.player_id.in_(missing))
+            .all()
+        )
+        for p in players:
+            if p.get("projection") is None:
+                p["projection"] = projected.get(p["player_id"])
+
+    return optimize_lineups(
+        players,
+        slots=input.get("slots"),
+        salary_cap=input["salary_cap"],
+        n_lineups=input["n_lineups"],
+        max_exposure=input["max_exposure"],
+        exposures=input.get("exposures"),
+        stack=input.get("stack"),
+        min_unique=input["min_unique"],
+        workers=input["workers"],
+    )
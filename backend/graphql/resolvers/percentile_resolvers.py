@@ -0,0 +1,9 @@
+from ariadne import QueryType
+from backend.services.percentiles import player_percentiles
+
+query = QueryType()
+
+@query.field("percentiles")
+def resolve_percentiles(_, info, playerId, season, stats=None, seasonType="REG", source="YEARLY"):
+    db = info.context["db"]
+    return player_percentiles(db, playerId, season, stats, seasonType, source)
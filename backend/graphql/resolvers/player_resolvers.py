@@ -1,5 +1,7 @@
 from ariadne import QueryType, MutationType
+from backend.graphql.loaders import load_by_pk
 from backend.models.dim_players import DimPlayers
+from backend.services.player_search import index_player, unindex_player
 
 query = QueryType()
 mutation = MutationType()
@@ -12,8 +14,7 @@ def resolve_all_players(_, info):
 
 @query.field("playerById")
 def resolve_player_by_id(_, info, player_id):
-    db = info.context["db"]
-    return db.query(DimPlayers).filter_by(player_id=player_id).first()
+    return load_by_pk(info, DimPlayers, player_id=player_id)
 
 # ---- Mutations ----
 @mutation.field("addPlayer")
@@ -23,6 +24,7 @@ def resolve_add_player(_, info, **kwargs):
     db.add(new_player)
     db.commit()
     db.refresh(new_player)
+    index_player(new_player)
     return new_player
 
 @mutation.field("updatePlayer")
@@ -36,6 +38,7 @@ def resolve_update_player(_, info, player_id, **kwargs):
             setattr(player, key, value)
     db.commit()
     db.refresh(player)
+    index_player(player)
     return player
 
 @mutation.field("deletePlayer")
@@ -46,4 +49,5 @@ def resolve_delete_player(_, info, player_id):
         return False
     db.delete(player)
     db.commit()
+    unindex_player(player_id)
     return True
@@ -0,0 +1,9 @@
+from ariadne import QueryType
+from backend.services.player_search import search_players
+
+query = QueryType()
+
+@query.field("searchPlayers")
+def resolve_search_players(_, info, query, position=None, limit=10, season=None):
+    db = info.context["db"]
+    return search_players(db, query, position, limit, season)
@@ -1,4 +1,6 @@
 from ariadne import QueryType, MutationType
+from backend.graphql.loaders import load_by_pk
+from backend.graphql.streaming import stream_rows
 from backend.models.player_weekly_stats import PlayerWeeklyStats
 
 query = QueryType()
@@ -7,14 +9,13 @@ mutation = MutationType()
 @query.field("allPlayerWeeklyStats")
 def resolve_all(_, info):
     db = info.context["db"]
-    return db.query(PlayerWeeklyStats).all()
+    return stream_rows(db, PlayerWeeklyStats)
 
 @query.field("playerWeeklyStatsByPK")
 def resolve_by_pk(_, info, player_id, season, season_type, week):
-    db = info.context["db"]
-    return db.query(PlayerWeeklyStats).filter_by(
-        player_id=player_id, season=season, season_type=season_type, week=week
-    ).first()
+    return load_by_pk(
+        info, PlayerWeeklyStats, player_id=player_id, season=season, season_type=season_type, week=week
+    )
 
 @mutation.field("addPlayerWeeklyStats")
 def add(_, info, playerWeeklyStatsInput):
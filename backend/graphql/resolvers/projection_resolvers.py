@@ -0,0 +1,14 @@
+from ariadne import QueryType
+from backend.models.player_weekly_projections import PlayerWeeklyProjections
+
+query = QueryType()
+
+@query.field("playerProjections")
+def resolve_player_projections(_, info, season, week, playerIds=None, position=None):
+    db = info.context["db"]
+    projections = db.query(PlayerWeeklyProjections).filter_by(season=season, week=week)
+    if playerIds:
+        projections = projections.filter(PlayerWeeklyProjections.player_id.in_(playerIds))
+    if position:
+        projections = projections.filter_by(position=position)
+    return projections.order_by(PlayerWeeklyProjections.fantasy_points_ppr.desc()).all()
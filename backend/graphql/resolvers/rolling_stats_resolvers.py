@@ -0,0 +1,20 @@
+from ariadne import QueryType
+from backend.services.weekly_stats_cube import get_season_cube
+
+query = QueryType()
+
+@query.field("rollingPlayerStats")
+def resolve_rolling_player_stats(_, info, playerIds, season, throughWeek, window, stats):
+    if window < 1:
+        raise ValueError("window must be at least 1 game")
+    db = info.context["db"]
+    cube = get_season_cube(db, season)
+    return cube.window(playerIds, throughWeek, stats, games=window)
+
+@query.field("seasonToDate")
+def resolve_season_to_date(_, info, playerIds, season, stats, throughWeek=None):
+    db = info.context["db"]
+    cube = get_season_cube(db, season)
+    if throughWeek is None:
+        throughWeek = cube.max_week
+    return cube.window(playerIds, throughWeek, stats)
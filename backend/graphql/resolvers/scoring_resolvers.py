@@ -0,0 +1,113 @@
+import json
+
+from ariadne import QueryType, MutationType, ObjectType
+from backend.models.scoring_settings import ScoringSettings
+from backend.services.scoring import (
+    BUILTIN_SCORING,
+    get_season_points,
+    invalidate_scoring,
+    normalize_weights,
+)
+
+query = QueryType()
+mutation = MutationType()
+player_weekly_stats = ObjectType("PlayerWeeklyStats")
+
+
+def _weights_from_input(input):
+    def as_dict(entries):
+        return {entry["stat"]: entry["points"] for entry in entries or []}
+
+    return normalize_weights({
+        "offense": as_dict(input.get("offense")),
+        "defense": as_dict(input.get("defense")),
+        "position_bonus": {
+            bonus["position"]: as_dict(bonus["weights"]) for bonus in input.get("position_bonus") or []
+        },
+    })
+
+
+def _to_graphql(scoring_id, name, weights):
+    weights = normalize_weights(weights)
+
+    def as_list(entries):
+        return [{"stat": stat, "points": points} for stat, points in entries.items()]
+
+    return {
+        "scoring_id": scoring_id,
+        "name": name,
+        "builtin": scoring_id in BUILTIN_SCORING,
+        "offense": as_list(weights["offense"]),
+        "defense": as_list(weights["defense"]),
+        "position_bonus": [
+            {"position": position, "weights": as_list(bonus)}
+            for position, bonus in weights["position_bonus"].items()
+        ],
+    }
+
+
+def _settings_to_graphql(settings):
+    return _to_graphql(settings.scoring_id, settings.name, json.loads(settings.weights))
+
+
+# ---- Queries ----
+@query.field("allScoringSettings")
+def resolve_all_scoring_settings(_, info):
+    db = info.context["db"]
+    builtins = [_to_graphql(sid, config["name"], config) for sid, config in BUILTIN_SCORING.items()]
+    return builtins + [_settings_to_graphql(s) for s in db.query(ScoringSettings).all()]
+
+@query.field("scoringSettingsById")
+def resolve_scoring_settings_by_id(_, info, scoring_id):
+    if scoring_id in BUILTIN_SCORING:
+        config = BUILTIN_SCORING[scoring_id]
+        return _to_graphql(scoring_id, config["name"], config)
+    db = info.context["db"]
+    settings = db.query(ScoringSettings).filter_by(scoring_id=scoring_id).first()
+    return _settings_to_graphql(settings) if settings else None
+
+# ---- Fields ----
+@player_weekly_stats.field("fantasyPoints")
+def resolve_fantasy_points(stat, info, scoringId):
+    db = info.context["db"]
+    return get_season_points(db, scoringId, stat.season).get(stat.player_id, stat.week)
+
+# ---- Mutations ----
+@mutation.field("addScoringSettings")
+def resolve_add_scoring_settings(_, info, input):
+    if input["scoring_id"] in BUILTIN_SCORING:
+        raise ValueError(f"'{input['scoring_id']}' is a built-in scoring id")
+    db = info.context["db"]
+    settings = ScoringSettings(
+        scoring_id=input["scoring_id"],
+        name=input["name"],
+        weights=json.dumps(_weights_from_input(input)),
+    )
+    db.add(settings)
+    db.commit()
+    db.refresh(settings)
+    return _settings_to_graphql(settings)
+
+@mutation.field("updateScoringSettings")
+def resolve_update_scoring_settings(_, info, scoring_id, input):
+    db = info.context["db"]
+    settings = db.query(ScoringSettings).filter_by(scoring_id=scoring_id).first()
+    if not settings:
+        return None
+    settings.name = input["name"]
+    settings.weights = json.dumps(_weights_from_input(input))
+    db.commit()
+    db.refresh(settings)
+    invalidate_scoring(scoring_id)
+    return _settings_to_graphql(settings)
+
+@mutation.field("deleteScoringSettings")
+def resolve_delete_scoring_settings(_, info, scoring_id):
+    db = info.context["db"]
+    settings = db.query(ScoringSettings).filter_by(scoring_id=scoring_id).first()
+    if not settings:
+        return False
+    db.delete(settings)
+    db.commit()
+    invalidate_scoring(scoring_id)
+    return True
@@ -0,0 +1,9 @@
+from ariadne import QueryType
+from backend.services.similarity import similar_players
+
+query = QueryType()
+
+@query.field("similarPlayers")
+def resolve_similar_players(_, info, playerId, season, k=10, statGroup="usage", metric="COSINE", minGames=1):
+    db = info.context["db"]
+    return similar_players(db, playerId, season, k, statGroup, metric, minGames)
@@ -1,4 +1,5 @@
 from ariadne import QueryType, MutationType
+from backend.graphql.loaders import load_by_pk
 from backend.models.dim_teams import DimTeams
 
 query = QueryType()
@@ -11,8 +12,7 @@ def resolve_all_teams(_, info):
 
 @query.field("teamById")
 def resolve_team_by_id(_, info, team_id):
-    db = info.context["db"]
-    return db.query(DimTeams).filter_by(team_id=team_id).first()
+    return load_by_pk(info, DimTeams, team_id=team_id)
 
 @mutation.field("addTeam")
 def resolve_add_team(_, info, team_id):
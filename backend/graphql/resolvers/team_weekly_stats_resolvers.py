@@ -1,4 +1,6 @@
 from ariadne import QueryType, MutationType
+from backend.graphql.loaders import load_by_pk
+from backend.graphql.streaming import stream_rows
 from backend.models.team_weekly_stats import TeamWeeklyStats
 
 query = QueryType()
@@ -7,12 +9,11 @@ mutation = MutationType()
 @query.field("allTeamWeeklyStats")
 def resolve_all_team_weekly_stats(_, info):
     db = info.context["db"]
-    return db.query(TeamWeeklyStats).all()
+    return stream_rows(db, TeamWeeklyStats)
 
 @query.field("teamWeeklyStatsByPK")
 def resolve_team_weekly_stats_by_pk(_, info, game_id, team_id):
-    db = info.context["db"]
-    return db.query(TeamWeeklyStats).filter_by(game_id=game_id, team_id=team_id).first()
+    return load_by_pk(info, TeamWeeklyStats, game_id=game_id, team_id=team_id)
 
 @mutation.field("addTeamWeeklyStats")
 def resolve_add_team_weekly_stats(_, info, input):
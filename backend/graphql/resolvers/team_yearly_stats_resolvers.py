@@ -1,4 +1,5 @@
 from ariadne import QueryType, MutationType
+from backend.graphql.loaders import load_by_pk
 from backend.models.team_yearly_stats import TeamYearlyStats
 
 query = QueryType()
@@ -13,12 +14,7 @@ def resolve_all_team_yearly_stats(_, info):
 
 @query.field("teamYearlyStatsByPK")
 def resolve_team_yearly_stats_by_pk(_, info, team_id, season, season_type):
-    db = info.context["db"]
-    return db.query(TeamYearlyStats).filter_by(
-        team_id=team_id,
-        season=season,
-        season_type=season_type
-    ).first()
+    return load_by_pk(info, TeamYearlyStats, team_id=team_id, season=season, season_type=season_type)
 
 # ----------- Mutation Resolvers -----------
 
@@ -0,0 +1,37 @@
+import asyncio
+import os
+
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+# Rows fetched from the server-side cursor per round trip
+STREAM_CHUNK_SIZE = int(os.getenv("GRAPHQL_STREAM_CHUNK_SIZE", 500))
+
+
+async def stream_rows(db, model, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield every row of `model` from a server-side cursor, chunk_size rows at a time.
+
+    Fetches run on a worker thread, so the event loop can flush a chunk to a @stream client
+    while the next one is read; only one chunk is held in memory. Without @stream the
+    executor simply collects the whole list.
+
+    The cursor stays open while each row's fields resolve, and those resolvers query the
+    request session, so the rows come from a session of their own on the same database.
+    """
+    stream_db = Session(bind=db.get_bind())
+    try:
+        result = await asyncio.to_thread(
+            lambda: stream_db.execute(select(model).execution_options(yield_per=chunk_size)).scalars()
+        )
+        chunks = result.partitions()
+        try:
+            while True:
+                chunk = await asyncio.to_thread(next, chunks, None)
+                if chunk is None:
+                    break
+                for row in chunk:
+                    yield row
+        finally:
+            result.close()
+    finally:
+        stream_db.close()
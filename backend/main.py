@@ -1,20 +1,64 @@
+import math
+import time
+
 from fastapi import FastAPI, Request
 from ariadne.asgi import GraphQL
 from backend.graphql.graphql_app import schema
-from backend.db import get_db
+from backend.graphql.http_handler import CoalescingGraphQLHTTPHandler, query_flight
+from backend.db import engine, get_db, READ_YOUR_WRITES_SECONDS
+from backend.models.player_weekly_projections import PlayerWeeklyProjections
+from backend.models.scoring_settings import ScoringSettings
+from backend.services.data_versions import ensure_table
 
 app = FastAPI()
 
+@app.on_event("startup")
+def create_missing_tables():
+    # Tables added after the initial schema; existing databases may not have them yet
+    ensure_table()
+    ScoringSettings.__table__.create(engine, checkfirst=True)
+    PlayerWeeklyProjections.__table__.create(engine, checkfirst=True)
+
+PRIMARY_COOKIE = "db_primary_until"
+
 @app.middleware("http")
 async def db_session_middleware(request: Request, call_next):
     request.state.db = next(get_db())
+    # Clients that wrote recently read from the primary until replicas have caught up
+    try:
+        primary_until = float(request.cookies.get(PRIMARY_COOKIE, 0))
+    except ValueError:
+        primary_until = 0
+    if primary_until > time.time():
+        request.state.db.info["primary"] = True
     response = await call_next(request)
+    if request.state.db.info.get("wrote"):
+        response.set_cookie(
+            PRIMARY_COOKIE,
+            str(time.time() + READ_YOUR_WRITES_SECONDS),
+            max_age=math.ceil(READ_YOUR_WRITES_SECONDS),
+            httponly=True,
+        )
     return response
 
 def get_context_value(request: Request):
     return {
         "request": request,
-        "db": request.state.db
+        "db": request.state.db,
+        "loaders": {},
     }
 
-app.add_route("/graphql", GraphQL(schema, context_value=get_context_value))
\ No newline at end of file
+@app.get("/metrics")
+def metrics():
+    return {"graphql_single_flight": query_flight.stats()}
+
+app.add_route(
+    "/graphql",
+    GraphQL(
+        schema,
+        context_value=get_context_value,
+        http_handler=CoalescingGraphQLHTTPHandler(),
+        # GET lets a CDN cache reads; ariadne only runs queries (never mutations) over GET
+        execute_get_queries=True,
+    ),
+)
\ No newline at end of file
@@ -0,0 +1,9 @@
+from sqlalchemy import Column, String, Integer
+from backend.db import Base
+
+class DataVersions(Base):
+    __tablename__ = "DataVersions"
+
+    # One row per data table; bumped by API mutations and by the ETL loads
+    table_name = Column(String(64), primary_key=True)
+    version = Column(Integer, nullable=False, default=0)
@@ -0,0 +1,30 @@
+from backend.db import Base
+from sqlalchemy import Column, String, Integer, Float, Index
+
+class DefenseVsPosition(Base):
+    """Fantasy points each defense allowed to each position, materialized per week.
+
+    Built by databaseSetup/ETL/etl_DefenseVsPosition.py from PlayerWeeklyStats, DimPlayers
+    and the opponent sharing each TeamWeeklyStats game_id.
+    """
+    __tablename__ = 'DefenseVsPosition'
+    __table_args__ = (
+        Index('ix_DefenseVsPosition_team_season', 'team_id', 'season'),
+    )
+
+    # Primary key order serves "every defense vs. RBs in week N" as a prefix lookup
+    season = Column(Integer, primary_key=True, nullable=False)
+    week = Column(Integer, primary_key=True, nullable=False)
+    position = Column(String(10), primary_key=True, nullable=False)
+    team_id = Column(String(10), primary_key=True, nullable=False)
+
+    opponent_id = Column(String(10))
+    players = Column(Integer)
+    fantasy_points_ppr = Column(Float)
+    fantasy_points_standard = Column(Float)
+    # Means over the defense's last ROLLING_WEEKS games (this one included)
+    rolling_points_ppr = Column(Float)
+    rolling_points_standard = Column(Float)
+    # Season-to-date means through this week
+    season_points_ppr = Column(Float)
+    season_points_standard = Column(Float)
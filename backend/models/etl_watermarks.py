@@ -0,0 +1,12 @@
+from sqlalchemy import Column, String, Integer
+from backend.db import Base
+
+class EtlWatermarks(Base):
+    __tablename__ = "EtlWatermarks"
+
+    # Latest slice of the CSV exports each fact table has ingested; the ETL reads only
+    # rows from here on. week is NULL for the yearly tables.
+    table_name = Column(String(64), primary_key=True)
+    season = Column(Integer, nullable=False)
+    season_type = Column(String(20), nullable=False)
+    week = Column(Integer)
@@ -0,0 +1,33 @@
+from backend.db import Base
+from sqlalchemy import Column, String, Integer, Float
+
+class PlayerWeeklyProjections(Base):
+    __tablename__ = 'PlayerWeeklyProjections'
+
+    player_id = Column(String(50), primary_key=True, nullable=False)
+    season = Column(Integer, primary_key=True, nullable=False)
+    week = Column(Integer, primary_key=True, nullable=False)
+
+    team_id = Column(String(10))
+    opponent_id = Column(String(10))
+    position = Column(String(10))
+
+    targets = Column(Float)
+    receptions = Column(Float)
+    rush_attempts = Column(Float)
+    pass_attempts = Column(Float)
+    passing_yards = Column(Float)
+    rushing_yards = Column(Float)
+    receiving_yards = Column(Float)
+    pass_touchdown = Column(Float)
+    rush_touchdown = Column(Float)
+    receiving_touchdown = Column(Float)
+    interception = Column(Float)
+    fumble_lost = Column(Float)
+    offense_pct = Column(Float)
+    fantasy_points_ppr = Column(Float)
+    fantasy_points_standard = Column(Float)
+
+    snap_trend = Column(Float)
+    opponent_factor = Column(Float)
+    games_used = Column(Integer)
@@ -1,8 +1,12 @@
 from backend.db import Base
-from sqlalchemy import Column, String, Integer, Float, ForeignKey
+from sqlalchemy import Column, String, Integer, Float, ForeignKey, Index
 
 class PlayerWeeklyStats(Base):
     __tablename__ = 'PlayerWeeklyStats'
+    __table_args__ = (
+        # Game lookups fetch every player of a team in one season/week
+        Index('ix_PlayerWeeklyStats_season_week_team', 'season', 'week', 'team_id'),
+    )
 
     player_id = Column(String(50), primary_key=True, nullable=False)
     season = Column(Integer, primary_key=True, nullable=False)
@@ -0,0 +1,10 @@
+from sqlalchemy import Column, String, Text
+from backend.db import Base
+
+class ScoringSettings(Base):
+    __tablename__ = "ScoringSettings"
+
+    scoring_id = Column(String(50), primary_key=True)
+    name = Column(String(255), nullable=False)
+    # JSON: {"offense": {stat: points}, "defense": {stat: points}, "position_bonus": {position: {stat: points}}}
+    weights = Column(Text, nullable=False)
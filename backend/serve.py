@@ -0,0 +1,44 @@
+"""Multi-worker entry point: publish a stat snapshot, then start uvicorn workers that map it.
+
+    python -m backend.serve --workers 4 --snapshot-dir /var/lib/nfl/stat_snapshot
+
+The ETL pipeline publishes a new version whenever it loads PlayerWeeklyStats with the same
+STAT_SNAPSHOT_DIR (or --snapshot-dir); `python -m backend.services.stat_snapshot --root <dir>`
+publishes one by hand. Workers switch to the new version on their next check of the
+CURRENT pointer.
+"""
+import argparse
+import os
+
+import uvicorn
+
+from backend.services import stat_snapshot
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve the GraphQL API with several workers.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--snapshot-dir", default=stat_snapshot.snapshot_root() or "stat_snapshot")
+    parser.add_argument("--skip-publish", action="store_true", help="attach to the snapshot already published")
+    args = parser.parse_args()
+
+    # Workers are spawned with this environment, so they all attach to the same snapshot
+    root = os.path.abspath(args.snapshot_dir)
+    os.environ[stat_snapshot.SNAPSHOT_ENV] = root
+    if not args.skip_publish:
+        from backend.db import SessionLocal
+
+        db = SessionLocal()
+        try:
+            version = stat_snapshot.publish_from_db(db, root)
+            print(f"Published snapshot v{version} to {root}")
+        finally:
+            db.close()
+
+    uvicorn.run("backend.main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+import hashlib
+import threading
+import time
+
+from sqlalchemy import event, insert, inspect, select, update
+from sqlalchemy.orm import Session
+
+from backend.db import engine
+from backend.models.data_versions import DataVersions
+
+# Tables each root query field reads; fields not listed here are never cached
+ROOT_FIELD_TABLES = {
+    "allPlayers": ["DimPlayers"],
+    "playerById": ["DimPlayers"],
+    "searchPlayers": ["DimPlayers", "PlayerWeeklyStats"],
+    "allTeams": ["DimTeams"],
+    "teamById": ["DimTeams"],
+    # PlayerWeeklyStats rows can also resolve fantasyPoints, which reads scoring settings
+    # and player positions
+    "allPlayerWeeklyStats": ["PlayerWeeklyStats", "ScoringSettings", "DimPlayers"],
+    "playerWeeklyStatsByPK": ["PlayerWeeklyStats", "ScoringSettings", "DimPlayers"],
+    "allPlayerYearlyStats": ["PlayerYearlyStats"],
+    "playerYearlyStatsByPK": ["PlayerYearlyStats"],
+    "allTeamWeeklyStats": ["TeamWeeklyStats"],
+    "teamWeeklyStatsByPK": ["TeamWeeklyStats"],
+    "allTeamYearlyStats": ["TeamYearlyStats"],
+    "teamYearlyStatsByPK": ["TeamYearlyStats"],
+    "rollingPlayerStats": ["PlayerWeeklyStats"],
+    "seasonToDate": ["PlayerWeeklyStats"],
+    "allScoringSettings": ["ScoringSettings"],
+    "scoringSettingsById": ["ScoringSettings"],
+    "similarPlayers": ["PlayerWeeklyStats", "DimPlayers"],
+    "playerProjections": ["PlayerWeeklyProjections"],
+    "game": ["TeamWeeklyStats", "PlayerWeeklyStats", "ScoringSettings", "DimPlayers"],
+    "games": ["TeamWeeklyStats", "PlayerWeeklyStats", "ScoringSettings", "DimPlayers"],
+    "defenseVsPosition": ["DefenseVsPosition"],
+    "percentiles": ["PlayerYearlyStats", "PlayerWeeklyStats", "DimPlayers"],
+    "__typename": [],
+}
+
+# Rows of these tables also bump a version per (season, week), so the stat cubes can
+# re-read only the weeks a load or mutation touched
+WEEK_VERSIONED_TABLES = {"PlayerWeeklyStats"}
+
+# Versions are re-read at most this often per worker; a worker's own writes clear it at once
+VERSIONS_TTL_SECONDS = 1.0
+
+_versions = None
+_read_at = 0.0
+_versions_lock = threading.Lock()
+_table_ready = False
+
+
+def ensure_table():
+    """Create DataVersions on the primary if it is missing; runs once per process."""
+    global _table_ready
+    if not _table_ready:
+        DataVersions.__table__.create(engine, checkfirst=True)
+        _table_ready = True
+
+
+def current_versions(db):
+    global _versions, _read_at
+    with _versions_lock:
+        if _versions is not None and time.monotonic() - _read_at < VERSIONS_TTL_SECONDS:
+            return _versions
+    ensure_table()
+    versions = dict(db.execute(select(DataVersions.table_name, DataVersions.version)).all())
+    with _versions_lock:
+        _versions, _read_at = versions, time.monotonic()
+    return versions
+
+
+def _forget_versions():
+    global _versions
+    with _versions_lock:
+        _versions = None
+
+
+def week_key(table_name, season, week):
+    return f"{table_name}:{int(season)}:{int(week)}"
+
+
+def season_week_versions(versions, table_name, season):
+    """{week: version} of one season's week keys in a current_versions() dict."""
+    prefix = f"{table_name}:{int(season)}:"
+    return {int(key[len(prefix):]): version for key, version in versions.items() if key.startswith(prefix)}
+
+
+def _week_keys(obj):
+    # Both sides of a season/week change: the row left one week and joined another
+    state = inspect(obj)
+    seasons = {value for value in state.attrs.season.history.sum() if value is not None}
+    weeks = {value for value in state.attrs.week.history.sum() if value is not None}
+    return {week_key(obj.__table__.name, season, week) for season in seasons for week in weeks}
+
+
+def bump_versions(connection, tables):
+    """Increment the version of each table, creating its row on first use."""
+    for table in sorted(set(tables)):
+        updated = connection.execute(
+            update(DataVersions)
+            .where(DataVersions.table_name == table)
+            .values(version=DataVersions.version + 1)
+        ).rowcount
+        if not updated:
+            connection.execute(insert(DataVersions).values(table_name=table, version=1))
+
+
+def etag_for(db, fields, key):
+    """Strong ETag for a read of `fields` (root field names), or None if one is not cacheable."""
+    if any(field not in ROOT_FIELD_TABLES for field in fields):
+        return None
+    versions = current_versions(db)
+    tables = sorted({table for field in fields for table in ROOT_FIELD_TABLES[field]})
+    stamp = ",".join(f"{table}:{versions.get(table, 0)}" for table in tables)
+    return '"' + hashlib.sha1(f"{key}|{stamp}".encode()).hexdigest() + '"'
+
+
+# ---- Bump on ORM writes ----
+# Every mutation goes through the ORM, so the flush tells us which tables changed and the
+# bump commits in the same transaction as the write.
+@event.listens_for(Session, "after_flush")
+def _bump_flushed_tables(session, flush_context):
+    flushed = [
+        obj
+        for obj in list(session.new) + list(session.deleted)
+        + [obj for obj in session.dirty if session.is_modified(obj)]
+        if getattr(obj, "__table__", None) is not None
+    ]
+    changed = {obj.__table__.name for obj in flushed}
+    for obj in flushed:
+        if obj.__table__.name in WEEK_VERSIONED_TABLES:
+            changed |= _week_keys(obj)
+    changed.discard(DataVersions.__tablename__)
+    if changed:
+        # Created on its own connection: DDL on the session's would commit the write early
+        ensure_table()
+        bump_versions(session.connection(), changed)
+        session.info["data_versions_changed"] = True
+
+
+@event.listens_for(Session, "after_commit")
+def _clear_after_commit(session):
+    if session.info.pop("data_versions_changed", False):
+        _forget_versions()
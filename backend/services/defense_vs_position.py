@@ -0,0 +1,21 @@
+from backend.models.defense_vs_position import DefenseVsPosition
+
+def defense_vs_position(db, season, week=None, position=None, team_id=None):
+    """Rows of the materialized table, most generous defenses (rolling PPR allowed) first.
+
+    Without a week, the newest week loaded for the season is used.
+    """
+    query = db.query(DefenseVsPosition).filter(DefenseVsPosition.season == season)
+    if week is None:
+        latest = query.with_entities(DefenseVsPosition.week).order_by(DefenseVsPosition.week.desc()).first()
+        if latest is None:
+            return []
+        week = latest[0]
+    query = query.filter(DefenseVsPosition.week == week)
+    if position is not None:
+        query = query.filter(DefenseVsPosition.position == position)
+    if team_id is not None:
+        query = query.filter(DefenseVsPosition.team_id == team_id)
+    return query.order_by(
+        DefenseVsPosition.position, DefenseVsPosition.rolling_points_ppr.desc(), DefenseVsPosition.team_id
+    ).all()
@@ -0,0 +1,69 @@
+from sqlalchemy import and_, select
+
+from backend.models.player_weekly_stats import PlayerWeeklyStats
+from backend.models.team_weekly_stats import TeamWeeklyStats
+
+
+def load_games(db, *criteria):
+    """Games whose TeamWeeklyStats rows match `criteria`, with both teams and their players.
+
+    One query: each team row is outer-joined to the PlayerWeeklyStats rows of that team in
+    the same season/week (served by the season/week/team index), then folded by game_id.
+    Each team's opponent is the other team row sharing its game_id.
+    """
+    rows = db.execute(
+        select(TeamWeeklyStats, PlayerWeeklyStats)
+        .outerjoin(
+            PlayerWeeklyStats,
+            and_(
+                PlayerWeeklyStats.season == TeamWeeklyStats.season,
+                PlayerWeeklyStats.week == TeamWeeklyStats.week,
+                PlayerWeeklyStats.team_id == TeamWeeklyStats.team_id,
+                PlayerWeeklyStats.season_type == TeamWeeklyStats.season_type,
+            ),
+        )
+        .where(*criteria)
+        .order_by(TeamWeeklyStats.game_id, TeamWeeklyStats.team_id, PlayerWeeklyStats.player_id)
+    ).all()
+
+    games = {}
+    for team_stats, player_stats in rows:
+        game = games.get(team_stats.game_id)
+        if game is None:
+            game = games[team_stats.game_id] = {
+                "game_id": team_stats.game_id,
+                "season": team_stats.season,
+                "season_type": team_stats.season_type,
+                "week": team_stats.week,
+                "teams": {},
+            }
+        team = game["teams"].get(team_stats.team_id)
+        if team is None:
+            team = game["teams"][team_stats.team_id] = {
+                "team_id": team_stats.team_id,
+                "stats": team_stats,
+                "players": [],
+            }
+        if player_stats is not None:
+            team["players"].append(player_stats)
+
+    for game in games.values():
+        teams = list(game["teams"].values())
+        for team in teams:
+            opponents = [other for other in teams if other is not team]
+            team["opponent_id"] = opponents[0]["team_id"] if opponents else None
+            team["opponent"] = opponents[0]["stats"] if opponents else None
+        game["teams"] = teams
+    return list(games.values())
+
+
+def get_game(db, game_id):
+    games = load_games(db, TeamWeeklyStats.game_id == game_id)
+    return games[0] if games else None
+
+
+def get_games(db, season, week, season_type=None):
+    criteria = [TeamWeeklyStats.season == season, TeamWeeklyStats.week == week]
+    if season_type is not None:
+        criteria.append(TeamWeeklyStats.season_type == season_type)
+    return load_games(db, *criteria)
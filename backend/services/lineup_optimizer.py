@@ -0,0 +1,309 @@
+import heapq
+import math
+import os
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+# Classic DFS offense: QB, 2 RB, 3 WR, TE and a RB/WR/TE flex
+DEFAULT_SLOTS = [
+    {"name": "QB", "positions": ["QB"]},
+    {"name": "RB", "positions": ["RB"]},
+    {"name": "RB", "positions": ["RB"]},
+    {"name": "WR", "positions": ["WR"]},
+    {"name": "WR", "positions": ["WR"]},
+    {"name": "WR", "positions": ["WR"]},
+    {"name": "TE", "positions": ["TE"]},
+    {"name": "FLEX", "positions": ["RB", "WR", "TE"]},
+]
+DEFAULT_SALARY_CAP = 50000
+# Extra cheaper-and-better rivals a player needs before the pre-search prune drops the player;
+# the slack keeps near-optimal alternatives around for the top-N and exposure passes
+DOMINANCE_SLACK = 2
+# Salary resolution of the search bound; finer is tighter but slower to build
+BOUND_BUCKETS = 1000
+# How far past the top N the search may widen when exposure or uniqueness rules reject a round
+MAX_WIDENING = 16
+# Size of the process pool every request shares; requests asking for more workers get this many
+MAX_WORKERS = max(int(os.getenv("LINEUP_MAX_WORKERS", os.cpu_count() or 1)), 1)
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def _shared_pool():
+    """The process-wide solver pool, started on first use."""
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=MAX_WORKERS)
+        return _pool
+
+
+class LineupProblem:
+    """Player pool and slot rules, flattened to lists so the search loop stays cheap."""
+
+    def __init__(self, players, slots, salary_cap, stack=None):
+        self.players = players
+        self.salary = [p["salary"] for p in players]
+        self.projection = [p["projection"] for p in players]
+        self.position = [p["position"] for p in players]
+        self.team = [p.get("team_id") for p in players]
+        self.salary_cap = salary_cap
+        self.stack = stack
+
+        eligible = [
+            [i for i, p in enumerate(players) if p["position"] in slot["positions"]] for slot in slots
+        ]
+        # Most constrained slots first; the first one is what the search partitions on
+        order = sorted(range(len(slots)), key=lambda s: (len(eligible[s]), s))
+        self.slot_order = order
+        self.slots = [slots[s] for s in order]
+        self.candidates = [
+            sorted(eligible[s], key=lambda i: -self.projection[i]) for s in order
+        ]
+        # Consecutive slots with the same eligibility are interchangeable: fill them in
+        # candidate order only, so RB1/RB2 swaps are never enumerated twice
+        self.same_as_previous = [
+            d > 0 and set(self.slots[d]["positions"]) == set(self.slots[d - 1]["positions"])
+            for d in range(len(self.slots))
+        ]
+
+        # Salary is bucketed for the search bound; costs round down so it never undershoots
+        self.unit = max(math.gcd(*self.salary, salary_cap) if self.salary else 1, salary_cap // BOUND_BUCKETS, 1)
+        self.bound = self.bound_tables()[0]
+
+    def is_stack_mate(self, i, team):
+        positions = self.stack.get("positions") or ["WR", "TE"]
+        return self.team[i] == team and self.position[i] in positions
+
+    def bound_tables(self, team=None, mates=0):
+        """tables[m][d][b]: most projection slots d.. can add with b salary buckets left while
+        supplying at least m stack mates from `team`.
+
+        Letting a player fill more than one slot keeps this a cheap knapsack DP and still a
+        valid upper bound.
+        """
+        buckets = self.salary_cap // self.unit
+        n = len(self.slots)
+        best = np.full((mates + 1, n + 1, buckets + 1), -np.inf)
+        best[0, n] = 0.0
+        for d in range(n - 1, -1, -1):
+            for i in self.candidates[d]:
+                cost = self.salary[i] // self.unit
+                if cost > buckets:
+                    continue
+                mate = team is not None and self.is_stack_mate(i, team)
+                for m in range(mates + 1):
+                    below = best[max(m - mate, 0), d + 1, :buckets + 1 - cost]
+                    best[m, d, cost:] = np.maximum(best[m, d, cost:], self.projection[i] + below)
+        return [[row.tolist() for row in table] for table in best]
+
+    def stack_ok(self, chosen):
+        if not self.stack:
+            return True
+        qbs = [i for i in chosen if self.position[i] == "QB"]
+        if not qbs:
+            return True
+        qb_team = self.team[qbs[0]]
+        mates = sum(1 for i in chosen if self.is_stack_mate(i, qb_team))
+        return mates >= self.stack["min_teammates"]
+
+
+def top_lineups(problem, k, anchors):
+    """Branch-and-bound for the k best distinct lineups whose first slot holds one of `anchors`.
+
+    Each branch is cut as soon as the salary-aware bound on the remaining slots cannot lift
+    it past the k-th best lineup found so far. When the anchor is a stacked QB the bound also
+    tracks how many of the QB's pass catchers are still needed.
+    """
+    n = len(problem.slots)
+    heap = []
+    seen = set()
+    chosen = []
+    used = set()
+    tie = 0
+    tables = [problem.bound]
+    team = None
+
+    def search(depth, cap_left, score, need, start, stop):
+        nonlocal tie
+        if depth == n:
+            key = frozenset(chosen)
+            if key in seen or not problem.stack_ok(chosen):
+                return
+            seen.add(key)
+            tie += 1
+            entry = (score, tie, tuple(chosen))
+            if len(heap) < k:
+                heapq.heappush(heap, entry)
+            elif score > heap[0][0]:
+                heapq.heapreplace(heap, entry)
+            return
+
+        cands = problem.candidates[depth]
+        best_rest = tables[0][depth + 1][-1]
+        next_interchangeable = depth + 1 < n and problem.same_as_previous[depth + 1]
+        next_stop = len(problem.candidates[depth + 1]) if depth + 1 < n else 0
+        for j in range(start, stop):
+            i = cands[j]
+            threshold = heap[0][0] if len(heap) == k else -math.inf
+            # Candidates are sorted by projection, so nothing later in the list can do better
+            if score + problem.projection[i] + best_rest <= threshold:
+                break
+            left = cap_left - problem.salary[i]
+            if i in used or left < 0:
+                continue
+            still_needed = max(need - (len(tables) > 1 and problem.is_stack_mate(i, team)), 0)
+            if score + problem.projection[i] + tables[still_needed][depth + 1][left // problem.unit] <= threshold:
+                continue
+            chosen.append(i)
+            used.add(i)
+            search(
+                depth + 1, left, score + problem.projection[i], still_needed,
+                j + 1 if next_interchangeable else 0, next_stop,
+            )
+            used.discard(i)
+            chosen.pop()
+
+    for anchor in anchors:
+        first = problem.candidates[0][anchor]
+        tables, team, needed = [problem.bound], None, 0
+        if problem.stack and problem.position[first] == "QB":
+            team = problem.team[first]
+            needed = problem.stack["min_teammates"] - problem.is_stack_mate(first, team)
+            if needed > 0:
+                tables = problem.bound_tables(team, needed)
+        search(0, problem.salary_cap, 0.0, max(needed, 0), anchor, anchor + 1)
+    return sorted(heap, reverse=True)
+
+
+def _solve_anchors(args):
+    problem, k, anchors = args
+    return [(score, chosen) for score, _, chosen in top_lineups(problem, k, anchors)]
+
+
+def prune_dominated(players, slots, protected=()):
+    """Drop players with more cheaper-and-better rivals at their position than could ever start."""
+    starters = {}
+    for slot in slots:
+        for position in slot["positions"]:
+            starters[position] = starters.get(position, 0) + 1
+    kept = []
+    for p in players:
+        rivals = sum(
+            1 for q in players
+            if q is not p and q["position"] == p["position"]
+            and q["salary"] <= p["salary"] and q["projection"] >= p["projection"]
+            and (q["salary"], -q["projection"]) != (p["salary"], -p["projection"])
+        )
+        if p["player_id"] in protected or rivals < starters.get(p["position"], 0) + DOMINANCE_SLACK:
+            kept.append(p)
+    return kept
+
+
+def optimize_lineups(players, slots=None, salary_cap=DEFAULT_SALARY_CAP, n_lineups=1,
+                     max_exposure=1.0, exposures=None, stack=None, min_unique=1, workers=1):
+    """Top-N lineups under salary, slot, exposure and QB-stacking rules.
+
+    The search partitions on the candidates for the most constrained slot (usually QB); with
+    workers > 1 the partitions are sharded over the shared process pool (at most MAX_WORKERS
+    shards) and each shard's N best are merged. The candidates are then taken best-first,
+    skipping any that would break an exposure cap or share too many players with an
+    accepted lineup (each pair must differ by at least min_unique players).
+    """
+    started = time.perf_counter()
+    slots = slots or DEFAULT_SLOTS
+    players = [p for p in players if p.get("projection") is not None and p["projection"] > 0]
+    protected = {p["player_id"] for p in players if p["position"] == "QB"} if stack else set()
+    if stack:
+        # Pass catchers on a QB's team may be needed to satisfy the stack, keep them all
+        qb_teams = {p.get("team_id") for p in players if p["position"] == "QB"}
+        stack_positions = stack.get("positions") or ["WR", "TE"]
+        protected |= {
+            p["player_id"] for p in players
+            if p.get("team_id") in qb_teams and p["position"] in stack_positions
+        }
+    players = prune_dominated(players, slots, protected)
+
+    caps = {}
+    for p in players:
+        limit = max_exposure
+        for override in exposures or []:
+            if override["player_id"] == p["player_id"]:
+                limit = override["max_exposure"]
+        caps[p["player_id"]] = max(1, math.floor(limit * n_lineups + 1e-9)) if limit > 0 else 0
+
+    accepted = []
+    counts = {}
+    searched = 0
+    width = n_lineups
+    workers = min(max(workers, 1), MAX_WORKERS)
+    pool = _shared_pool() if workers > 1 else None
+    # Players drop out of the pool once they hit their exposure cap, and the search is
+    # repeated until enough lineups are accepted or a round adds nothing new
+    while len(accepted) < n_lineups:
+        available = [p for p in players if counts.get(p["player_id"], 0) < caps[p["player_id"]]]
+        problem = LineupProblem(available, slots, salary_cap, stack)
+        if not problem.candidates[0]:
+            break
+        anchors = range(len(problem.candidates[0]))
+        if pool and len(anchors) > 1:
+            # Round-robin over the projection-sorted anchors keeps the shards balanced
+            jobs = [(problem, width, anchors[w::workers]) for w in range(workers)]
+            results = list(pool.map(_solve_anchors, jobs))
+        else:
+            results = [_solve_anchors((problem, width, anchors))]
+        # Flex slots let one lineup turn up under two anchors, once per shard at most
+        merged = {}
+        for score, chosen in sorted((e for result in results for e in result), key=lambda e: -e[0]):
+            merged.setdefault(frozenset(chosen), (score, chosen))
+        candidates = list(merged.values())[:width]
+        searched += len(candidates)
+
+        added = 0
+        for score, chosen in candidates:
+            if len(accepted) == n_lineups:
+                break
+            ids = [available[i]["player_id"] for i in chosen]
+            if any(counts.get(pid, 0) >= caps[pid] for pid in ids):
+                continue
+            members = set(ids)
+            if any(len(members - lineup["members"]) < min_unique for lineup in accepted):
+                continue
+            accepted.append({
+                "members": members,
+                "players": [
+                    {
+                        "slot": problem.slots[d]["name"],
+                        "player_id": available[i]["player_id"],
+                        "position": available[i]["position"],
+                        "team_id": available[i].get("team_id"),
+                        "salary": available[i]["salary"],
+                        "projection": available[i]["projection"],
+                    }
+                    for d, i in sorted(enumerate(chosen), key=lambda item: problem.slot_order[item[0]])
+                ],
+                "salary": sum(available[i]["salary"] for i in chosen),
+                "projection": score,
+            })
+            for pid in ids:
+                counts[pid] = counts.get(pid, 0) + 1
+            added += 1
+        if not added:
+            # Everything this deep clashes with what was accepted; look further down the
+            # ranking, unless the search has already run out of lineups
+            if len(candidates) < width or width >= n_lineups * MAX_WIDENING:
+                break
+            width *= 2
+
+    return {
+        "lineups": [
+            {"players": lineup["players"], "salary": lineup["salary"], "projection": lineup["projection"]}
+            for lineup in accepted
+        ],
+        "candidates": searched,
+        "solve_time_ms": (time.perf_counter() - started) * 1000.0,
+    }
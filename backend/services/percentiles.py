@@ -0,0 +1,140 @@
+import threading
+
+import numpy as np
+from sqlalchemy import Float, Integer, case, func, select
+
+from backend.models.dim_players import DimPlayers
+from backend.models.player_weekly_stats import PlayerWeeklyStats
+from backend.models.player_yearly_stats import PlayerYearlyStats
+from backend.services.data_versions import current_versions
+
+# YEARLY ranks season totals from PlayerYearlyStats; WEEKLY ranks per-game means of the
+# season's PlayerWeeklyStats rows
+SOURCES = {"YEARLY": PlayerYearlyStats, "WEEKLY": PlayerWeeklyStats}
+
+
+def canonical_season_type(season_type):
+    """'REG' or 'POST' for any label: the weekly ETL stores 'Reg'/'Post', the yearly one 'REG'/'POST'."""
+    return "POST" if str(season_type).strip().lower().startswith("post") else "REG"
+
+
+def _season_type_column(model):
+    # The SQL twin of canonical_season_type, so partitions group on the canonical label
+    return case((func.lower(model.season_type).like("post%"), "POST"), else_="REG").label("season_type")
+
+
+def stat_columns(model):
+    return [
+        column.name for column in model.__table__.columns
+        if not column.primary_key and isinstance(column.type, (Integer, Float))
+    ]
+
+
+class PercentilePartition:
+    """Every player's values for one (season, season_type, position), sorted per stat.
+
+    A lookup is a pair of binary searches per stat, so it costs the same however many
+    players share the partition.
+    """
+
+    def __init__(self, player_ids, columns, values):
+        self.player_index = {pid: i for i, pid in enumerate(player_ids)}
+        self.column_index = {name: j for j, name in enumerate(columns)}
+        self.values = values
+        self.sorted = [np.sort(values[~np.isnan(values[:, j]), j]) for j in range(len(columns))]
+
+    def lookup(self, player_id, stats):
+        row = self.player_index[player_id]
+        results = []
+        for stat in stats:
+            j = self.column_index[stat]
+            value, ranked = self.values[row, j], self.sorted[j]
+            if np.isnan(value):
+                results.append({"stat": stat, "value": None, "rank": None, "percentile": None, "players": len(ranked)})
+                continue
+            below = int(np.searchsorted(ranked, value, side="left"))
+            tied = int(np.searchsorted(ranked, value, side="right")) - below
+            # Ties share the best rank and sit at the midpoint of their percentile range
+            percentile = 100.0 * (below + 0.5 * (tied - 1)) / (len(ranked) - 1) if len(ranked) > 1 else 100.0
+            results.append({
+                "stat": stat,
+                "value": float(value),
+                "rank": len(ranked) - below - tied + 1,
+                "percentile": percentile,
+                "players": len(ranked),
+            })
+        return results
+
+
+_partitions = {}
+_partitions_lock = threading.Lock()
+
+
+def _load_season(db, source, season):
+    """{(season_type, position): partition} plus each player's partition key."""
+    model = SOURCES[source]
+    columns = stat_columns(model)
+    season_type = _season_type_column(model)
+    if source == "YEARLY":
+        stats = [getattr(model, name) for name in columns]
+        group_by = ()
+    else:
+        stats = [func.avg(getattr(model, name)).label(name) for name in columns]
+        group_by = (model.player_id, season_type, DimPlayers.position)
+    rows = db.execute(
+        select(model.player_id, season_type, DimPlayers.position, *stats)
+        .join(DimPlayers, DimPlayers.player_id == model.player_id)
+        .where(model.season == season)
+        .group_by(*group_by)
+    ).all()
+
+    grouped = {}
+    for row in rows:
+        grouped.setdefault((row.season_type, row.position), []).append(row)
+    partitions, membership = {}, {}
+    for key, members in grouped.items():
+        player_ids = [row.player_id for row in members]
+        values = np.array([row[3:] for row in members], dtype=float)
+        partitions[key] = PercentilePartition(player_ids, columns, values)
+        for player_id in player_ids:
+            membership[(player_id, key[0])] = key
+    return partitions, membership
+
+
+def get_season_partitions(db, source, season):
+    """Partitions for a season, rebuilt when the source table's or DimPlayers' DataVersion moves."""
+    versions = current_versions(db)
+    version = (versions.get(SOURCES[source].__tablename__, 0), versions.get(DimPlayers.__tablename__, 0))
+    key = (source, season)
+    with _partitions_lock:
+        cached = _partitions.get(key)
+        if cached and cached[0] == version:
+            return cached[1]
+    loaded = _load_season(db, source, season)
+    with _partitions_lock:
+        _partitions[key] = (version, loaded)
+    return loaded
+
+
+def player_percentiles(db, player_id, season, stats=None, season_type="REG", source="YEARLY"):
+    if source not in SOURCES:
+        raise ValueError(f"Unknown source {source!r}; expected one of {', '.join(SOURCES)}")
+    columns = stat_columns(SOURCES[source])
+    stats = stats or columns
+    unknown = [stat for stat in stats if stat not in columns]
+    if unknown:
+        raise ValueError(f"Unknown stats: {', '.join(unknown)}")
+
+    season_type = canonical_season_type(season_type)
+    partitions, membership = get_season_partitions(db, source, season)
+    key = membership.get((player_id, season_type))
+    if key is None:
+        return None
+    return {
+        "player_id": player_id,
+        "season": season,
+        "season_type": season_type,
+        "position": key[1],
+        "source": source,
+        "stats": partitions[key].lookup(player_id, stats),
+    }
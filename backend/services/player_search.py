@@ -0,0 +1,265 @@
+import re
+import threading
+import unicodedata
+
+import numpy as np
+
+from backend.models.dim_players import DimPlayers
+from backend.services.scoring import get_season_points
+
+# College matches count for less than name matches of the same quality
+COLLEGE_WEIGHT = 0.6
+# Added when a name word starts with the last (still being typed) query word, before the
+# MIN_SIMILARITY cut
+PREFIX_BONUS = 0.25
+# Share of the final score given to season fantasy production when a season is requested
+PRODUCTION_WEIGHT = 0.2
+# Candidates re-ranked with the prefix and production terms, per requested result
+RERANK_FACTOR = 5
+# Matches below this trigram similarity are noise ("quorb" vs "Saquon")
+MIN_SIMILARITY = 0.15
+PRODUCTION_SCORING = "ppr"
+
+
+def normalize(text):
+    """Lowercase, strip accents and punctuation: "Ja'Marr Chase" -> "jamarr chase"."""
+    text = unicodedata.normalize("NFKD", text or "")
+    text = "".join(ch for ch in text if not unicodedata.combining(ch)).lower()
+    text = re.sub(r"[^a-z0-9 ]+", "", text.replace("-", " "))
+    return " ".join(text.split())
+
+
+def trigrams(text, partial_last=False):
+    """pg_trgm style trigrams: each word padded with two leading blanks and one trailing.
+
+    With partial_last the final word gets no trailing blank, so a half-typed "patr" still
+    matches every trigram of "patrick".
+    """
+    words = normalize(text).split()
+    grams = set()
+    for n, word in enumerate(words):
+        last = partial_last and n == len(words) - 1
+        padded = "  " + word + ("" if last else " ")
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class PlayerSearchIndex:
+    """Trigram postings over player names and colleges, kept in memory.
+
+    Each player owns a slot; postings map a trigram to a numpy array of slots, so scoring a
+    query is one bincount per field over the postings of its trigrams. Slots of deleted
+    players are retired rather than reused.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.slots = {}
+        self.players = []
+        self.active = np.zeros(0, dtype=bool)
+        self.position_codes = {}
+        self.position = np.zeros(0, dtype=np.int32)
+        self.fields = {
+            "name": ({}, np.zeros(0)),
+            "college": ({}, np.zeros(0)),
+        }
+
+    def __len__(self):
+        return len(self.slots)
+
+    def _grow(self):
+        slot = len(self.players)
+        self.players.append(None)
+        self.active = np.append(self.active, False)
+        self.position = np.append(self.position, np.int32(-1))
+        for field, (postings, sizes) in self.fields.items():
+            self.fields[field] = (postings, np.append(sizes, 0.0))
+        return slot
+
+    def _post(self, field, slot, grams):
+        postings, sizes = self.fields[field]
+        for gram in grams:
+            postings[gram] = np.append(postings.get(gram, np.zeros(0, dtype=np.int64)), slot)
+        sizes[slot] = len(grams)
+
+    def _unpost(self, field, slot, grams):
+        postings, sizes = self.fields[field]
+        for gram in grams:
+            remaining = postings[gram][postings[gram] != slot]
+            if len(remaining):
+                postings[gram] = remaining
+            else:
+                del postings[gram]
+        sizes[slot] = 0.0
+
+    def upsert(self, player_id, player_name, position=None, college=None):
+        with self.lock:
+            self._remove(player_id)
+            slot = self._grow()
+            name_grams, college_grams = trigrams(player_name), trigrams(college)
+            self.players[slot] = {
+                "player_id": player_id,
+                "player_name": player_name,
+                "position": position,
+                "college": college,
+                "words": normalize(player_name).split(),
+                "grams": (name_grams, college_grams),
+            }
+            self.slots[player_id] = slot
+            self.active[slot] = True
+            self.position[slot] = self.position_codes.setdefault(position, len(self.position_codes))
+            self._post("name", slot, name_grams)
+            self._post("college", slot, college_grams)
+
+    def load(self, rows):
+        """Bulk build from (player_id, player_name, position, college) rows."""
+        with self.lock:
+            self.slots, self.players, self.position_codes = {}, [], {}
+            postings = {"name": {}, "college": {}}
+            sizes = {"name": [], "college": []}
+            codes = []
+            for slot, (player_id, player_name, position, college) in enumerate(rows):
+                grams = (trigrams(player_name), trigrams(college))
+                self.players.append({
+                    "player_id": player_id,
+                    "player_name": player_name,
+                    "position": position,
+                    "college": college,
+                    "words": normalize(player_name).split(),
+                    "grams": grams,
+                })
+                self.slots[player_id] = slot
+                codes.append(self.position_codes.setdefault(position, len(self.position_codes)))
+                for field, field_grams in zip(("name", "college"), grams):
+                    sizes[field].append(len(field_grams))
+                    for gram in field_grams:
+                        postings[field].setdefault(gram, []).append(slot)
+            self.active = np.ones(len(self.players), dtype=bool)
+            self.position = np.array(codes, dtype=np.int32)
+            self.fields = {
+                field: (
+                    {gram: np.array(slots, dtype=np.int64) for gram, slots in postings[field].items()},
+                    np.array(sizes[field], dtype=float),
+                )
+                for field in postings
+            }
+
+    def remove(self, player_id):
+        with self.lock:
+            self._remove(player_id)
+
+    def _remove(self, player_id):
+        slot = self.slots.pop(player_id, None)
+        if slot is None:
+            return
+        name_grams, college_grams = self.players[slot]["grams"]
+        self._unpost("name", slot, name_grams)
+        self._unpost("college", slot, college_grams)
+        self.players[slot] = None
+        self.active[slot] = False
+
+    def _shared(self, field, grams):
+        postings, sizes = self.fields[field]
+        hits = [postings[gram] for gram in grams if gram in postings]
+        if not hits:
+            return np.zeros(len(sizes), dtype=np.int64)
+        return np.bincount(np.concatenate(hits), minlength=len(sizes))
+
+    def _similarity(self, field, grams, shared, slots):
+        """Jaccard similarity of the query trigrams against the given slots."""
+        sizes = self.fields[field][1][slots]
+        return shared[slots] / np.maximum(len(grams) + sizes - shared[slots], 1.0)
+
+    def search(self, query, position=None, limit=10, production=None):
+        """Best matches for `query` as (player, score) pairs.
+
+        production: optional (player_index, totals) pair used to lift productive players
+        among similar names.
+        """
+        grams = trigrams(query, partial_last=True)
+        words = normalize(query).split()
+        if not grams or limit <= 0:
+            return []
+        with self.lock:
+            name_shared = self._shared("name", grams)
+            college_shared = self._shared("college", grams)
+            mask = (name_shared + college_shared) > 0
+            if position is not None:
+                mask &= self.position == self.position_codes.get(position, -2)
+            candidates = np.flatnonzero(mask & self.active)
+            scores = np.maximum(
+                self._similarity("name", grams, name_shared, candidates),
+                COLLEGE_WEIGHT * self._similarity("college", grams, college_shared, candidates),
+            )
+            # The bonus counts toward the cut, so short typeahead prefixes ("pa") still match
+            prefix = np.fromiter(
+                (any(word.startswith(words[-1]) for word in self.players[slot]["words"]) for slot in candidates),
+                dtype=bool,
+                count=len(candidates),
+            )
+            scores = scores + PREFIX_BONUS * prefix
+            keep = scores >= MIN_SIMILARITY
+            candidates, scores = candidates[keep], scores[keep]
+            if len(candidates) > limit * RERANK_FACTOR:
+                top = np.argpartition(-scores, limit * RERANK_FACTOR - 1)[:limit * RERANK_FACTOR]
+                candidates, scores = candidates[top], scores[top]
+            players = [self.players[slot] for slot in candidates]
+            base = scores
+
+        player_index, totals = production or ({}, np.zeros(0))
+        top_production = float(totals.max()) if len(totals) else 0.0
+        ranked = []
+        for player, score in zip(players, base):
+            score = float(score)
+            if top_production > 0:
+                row = player_index.get(player["player_id"])
+                share = max(float(totals[row]), 0.0) / top_production if row is not None else 0.0
+                score = (1.0 - PRODUCTION_WEIGHT) * score + PRODUCTION_WEIGHT * share
+            ranked.append((player, score))
+        ranked.sort(key=lambda item: (-item[1], item[0]["player_name"]))
+        return ranked[:limit]
+
+
+_index = None
+_index_lock = threading.Lock()
+
+
+def get_search_index(db):
+    """The process-wide index, loaded from DimPlayers on first use."""
+    global _index
+    with _index_lock:
+        if _index is None:
+            index = PlayerSearchIndex()
+            index.load(db.query(
+                DimPlayers.player_id, DimPlayers.player_name, DimPlayers.position, DimPlayers.college
+            ).all())
+            _index = index
+        return _index
+
+
+def index_player(player):
+    """Keep an already-built index in step with a DimPlayers add/update."""
+    if _index is not None:
+        _index.upsert(player.player_id, player.player_name, player.position, player.college)
+
+
+def unindex_player(player_id):
+    if _index is not None:
+        _index.remove(player_id)
+
+
+def search_players(db, query, position=None, limit=10, season=None):
+    production = None
+    if season is not None:
+        points = get_season_points(db, PRODUCTION_SCORING, season)
+        production = (points.player_index, np.nansum(points.points, axis=1))
+    return [
+        {
+            "player_id": player["player_id"],
+            "player_name": player["player_name"],
+            "position": player["position"],
+            "college": player["college"],
+            "score": score,
+        }
+        for player, score in get_search_index(db).search(query, position, limit, production)
+    ]
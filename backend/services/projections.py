@@ -0,0 +1,236 @@
+import argparse
+import time
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sqlalchemy import delete, insert, select
+
+from backend.db import engine
+from backend.models.dim_players import DimPlayers
+from backend.models.player_weekly_projections import PlayerWeeklyProjections
+from backend.models.team_weekly_stats import TeamWeeklyStats
+from backend.services.data_versions import bump_versions, ensure_table
+from backend.services.weekly_stats_cube import SeasonCube, load_weekly_columns, stat_indices
+
+PROJECTED_STATS = [
+    "targets", "receptions", "rush_attempts", "pass_attempts", "passing_yards",
+    "rushing_yards", "receiving_yards", "pass_touchdown", "rush_touchdown",
+    "receiving_touchdown", "interception", "fumble_lost", "offense_pct",
+    "fantasy_points_ppr", "fantasy_points_standard",
+]
+# Everything except the snap share itself scales with the matchup
+OPPONENT_ADJUSTED = [name for name in PROJECTED_STATS if name != "offense_pct"]
+
+DEFAULT_HALFLIFE = 3.0  # in games played, so byes and injuries do not decay a player's history
+TREND_HALFLIFE = 1.0
+PRIOR_SEASON_WEIGHT = 0.5
+TREND_BOUNDS = (0.75, 1.25)
+OPPONENT_BOUNDS = (0.8, 1.2)
+
+
+def _ew_weights(games, halflife, column_weight):
+    """Exponential weights per (player, week), ageing one step per game played after the week."""
+    games_after = np.flip(np.cumsum(np.flip(games, axis=1), axis=1), axis=1) - games
+    return games * column_weight[None, :] * 0.5 ** (games_after / halflife)
+
+
+def project_block(values, games, column_weight, halflife):
+    """Vectorized projections for a block of players.
+
+    values: (players, weeks, stats) history in PROJECTED_STATS order
+    games: (players, weeks) 1.0 where the player played
+    Returns (expected per-game stats, snap-share trend multiplier, games used).
+    """
+    weights = _ew_weights(games, halflife, column_weight)
+    total = weights.sum(axis=1)
+    safe_total = np.where(total > 0, total, 1.0)
+    means = np.einsum("pt,pts->ps", weights, values) / safe_total[:, None]
+
+    snaps = PROJECTED_STATS.index("offense_pct")
+    short = _ew_weights(games, TREND_HALFLIFE, column_weight)
+    short_total = np.where(short.sum(axis=1) > 0, short.sum(axis=1), 1.0)
+    short_snaps = np.einsum("pt,pt->p", short, values[:, :, snaps]) / short_total
+    long_snaps = means[:, snaps]
+    trend = np.where(long_snaps > 0, short_snaps / np.where(long_snaps > 0, long_snaps, 1.0), 1.0)
+    return means, np.clip(trend, *TREND_BOUNDS), games.sum(axis=1)
+
+
+def _season_history(db, season, before_week=None):
+    columns = load_weekly_columns(db, season)
+    if before_week is not None:
+        keep = columns["week"] < before_week
+        columns = {name: column[keep] for name, column in columns.items()}
+    cube = SeasonCube(season)
+    cube.load(columns)
+    return cube, columns
+
+
+def _aligned(cube, player_ids, indices):
+    values = np.zeros((len(player_ids), cube.max_week, len(indices)))
+    games = np.zeros((len(player_ids), cube.max_week))
+    rows = [i for i, pid in enumerate(player_ids) if pid in cube.player_index]
+    source = [cube.player_index[player_ids[i]] for i in rows]
+    if rows:
+        values[rows] = cube.weekly_values()[source][:, :, indices]
+        games[rows] = cube.weekly_games()[source]
+    return values, games
+
+
+def _latest_teams(*column_sets):
+    # Later seasons are passed last and rows are applied in week order, so the latest team wins
+    teams = {}
+    for columns in column_sets:
+        order = np.argsort(columns["week"], kind="stable")
+        teams.update(zip(columns["player_id"][order], columns["team_id"][order]))
+    return teams
+
+
+def opponent_factors(db, season, week, halflife):
+    """Per-team multiplier on offensive production allowed, plus the team's opponent in `week`."""
+    rows = db.execute(
+        select(
+            TeamWeeklyStats.game_id, TeamWeeklyStats.team_id, TeamWeeklyStats.season,
+            TeamWeeklyStats.week, TeamWeeklyStats.total_off_yards,
+        ).where(TeamWeeklyStats.season.in_([season - 1, season]))
+    ).all()
+
+    games = defaultdict(list)
+    for row in rows:
+        games[row.game_id].append(row)
+
+    allowed = defaultdict(list)
+    upcoming = {}
+    for teams in games.values():
+        if len(teams) != 2:
+            continue
+        for team, opponent in (teams, teams[::-1]):
+            if team.season == season and team.week == week:
+                upcoming[team.team_id] = opponent.team_id
+            elif (team.season, team.week) < (season, week):
+                allowed[team.team_id].append((team.season, team.week, opponent.total_off_yards or 0.0))
+
+    league = [yards for history in allowed.values() for _, _, yards in history]
+    league_mean = float(np.mean(league)) if league else 0.0
+    factors = {}
+    for team_id, history in allowed.items():
+        history.sort()
+        yards = np.array([y for _, _, y in history])
+        weights = 0.5 ** (np.arange(len(yards))[::-1] / halflife)
+        if league_mean > 0:
+            factors[team_id] = float(np.clip(yards @ weights / weights.sum() / league_mean, *OPPONENT_BOUNDS))
+    return factors, upcoming
+
+
+def compute_projections(db, season, week, halflife=DEFAULT_HALFLIFE, workers=1):
+    indices = stat_indices(PROJECTED_STATS)
+    current, current_columns = _season_history(db, season, before_week=week)
+    previous, previous_columns = _season_history(db, season - 1)
+
+    # Players with a game this season, or anyone from last season before week 1 has been played
+    source = current if current.player_ids else previous
+    player_ids = [
+        pid for pid, games in zip(source.player_ids, source.prefix[:, -1, -1]) if games > 0
+    ]
+    if not player_ids:
+        return []
+
+    prev_values, prev_games = _aligned(previous, player_ids, indices)
+    cur_values, cur_games = _aligned(current, player_ids, indices)
+    values = np.concatenate([prev_values, cur_values], axis=1)
+    games = np.concatenate([prev_games, cur_games], axis=1)
+    column_weight = np.concatenate([
+        np.full(prev_games.shape[1], PRIOR_SEASON_WEIGHT), np.ones(cur_games.shape[1])
+    ])
+
+    positions = dict(
+        db.query(DimPlayers.player_id, DimPlayers.position)
+        .filter(DimPlayers.player_id.in_(player_ids))
+        .all()
+    )
+    blocks = defaultdict(list)
+    for i, pid in enumerate(player_ids):
+        blocks[positions.get(pid)].append(i)
+    blocks = {position: np.array(rows) for position, rows in blocks.items()}
+
+    means = np.zeros((len(player_ids), len(indices)))
+    trend = np.ones(len(player_ids))
+    games_used = np.zeros(len(player_ids))
+    jobs = [(values[rows], games[rows], column_weight, halflife) for rows in blocks.values()]
+    if workers > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(project_block, *zip(*jobs)))
+    else:
+        results = [project_block(*job) for job in jobs]
+    for rows, (block_means, block_trend, block_games) in zip(blocks.values(), results):
+        means[rows], trend[rows], games_used[rows] = block_means, block_trend, block_games
+
+    factors, upcoming = opponent_factors(db, season, week, halflife)
+    teams = _latest_teams(previous_columns, current_columns)
+    opponents = [upcoming.get(teams.get(pid)) for pid in player_ids]
+    opponent_factor = np.array([factors.get(opp, 1.0) for opp in opponents])
+
+    projected = means * trend[:, None]
+    adjusted = [PROJECTED_STATS.index(name) for name in OPPONENT_ADJUSTED]
+    projected[:, adjusted] *= opponent_factor[:, None]
+
+    return [
+        {
+            "player_id": pid,
+            "season": season,
+            "week": week,
+            "team_id": teams.get(pid),
+            "opponent_id": opponents[i],
+            "position": positions.get(pid),
+            **{name: float(projected[i, j]) for j, name in enumerate(PROJECTED_STATS)},
+            "snap_trend": float(trend[i]),
+            "opponent_factor": float(opponent_factor[i]),
+            "games_used": int(games_used[i]),
+        }
+        for i, pid in enumerate(player_ids)
+    ]
+
+
+def save_projections(db, season, week, records):
+    # The batch job may run before the API has ever started against this database
+    PlayerWeeklyProjections.__table__.create(engine, checkfirst=True)
+    ensure_table()
+    db.execute(
+        delete(PlayerWeeklyProjections).where(
+            PlayerWeeklyProjections.season == season,
+            PlayerWeeklyProjections.week == week,
+        )
+    )
+    if records:
+        db.execute(insert(PlayerWeeklyProjections), records)
+    # Bulk statements skip the ORM flush that bumps versions for mutations
+    bump_versions(db.connection(), ["PlayerWeeklyProjections"])
+    db.commit()
+
+
+def main():
+    from backend.db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Recompute PlayerWeeklyProjections for one week.")
+    parser.add_argument("--season", type=int, required=True)
+    parser.add_argument("--week", type=int, required=True)
+    parser.add_argument("--halflife", type=float, default=DEFAULT_HALFLIFE)
+    parser.add_argument("--workers", type=int, default=1, help="process pool size (split by position)")
+    args = parser.parse_args()
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        records = compute_projections(db, args.season, args.week, args.halflife, args.workers)
+        computed = time.perf_counter()
+        save_projections(db, args.season, args.week, records)
+        print(
+            f"Projected {len(records)} players for {args.season} week {args.week}: "
+            f"compute {computed - started:.2f}s, save {time.perf_counter() - computed:.2f}s"
+        )
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
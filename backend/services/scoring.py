@@ -0,0 +1,180 @@
+import hashlib
+import json
+import threading
+
+import numpy as np
+
+from backend.models.dim_players import DimPlayers
+from backend.models.scoring_settings import ScoringSettings
+from backend.services.data_versions import current_versions
+from backend.services.weekly_stats_cube import STAT_COLUMNS, get_season_cube, stat_indices
+
+# ---- Built-in scoring settings ----
+STANDARD_OFFENSE = {
+    "passing_yards": 0.04,
+    "pass_touchdown": 4.0,
+    "interception": -2.0,
+    "rushing_yards": 0.1,
+    "rush_touchdown": 6.0,
+    "receiving_yards": 0.1,
+    "receiving_touchdown": 6.0,
+    "fumble_lost": -2.0,
+}
+HALF_PPR_OFFENSE = {**STANDARD_OFFENSE, "receptions": 0.5}
+PPR_OFFENSE = {**STANDARD_OFFENSE, "receptions": 1.0}
+IDP_DEFENSE = {
+    "solo_tackle": 1.0,
+    "assist_tackle": 0.5,
+    "sack": 2.0,
+    "interception": 3.0,
+    "fumble_forced": 2.0,
+    "def_touchdown": 6.0,
+    "safety": 2.0,
+}
+
+BUILTIN_SCORING = {
+    "standard": {"name": "Standard", "offense": STANDARD_OFFENSE},
+    "half_ppr": {"name": "Half PPR", "offense": HALF_PPR_OFFENSE},
+    "ppr": {"name": "PPR", "offense": PPR_OFFENSE},
+    "te_premium": {
+        "name": "PPR, TE premium",
+        "offense": PPR_OFFENSE,
+        "position_bonus": {"TE": {"receptions": 0.5}},
+    },
+    "six_pt_pass_td": {
+        "name": "Half PPR, 6pt passing TD",
+        "offense": {**HALF_PPR_OFFENSE, "pass_touchdown": 6.0},
+    },
+    "idp": {"name": "Half PPR + IDP", "offense": HALF_PPR_OFFENSE, "defense": IDP_DEFENSE},
+}
+
+
+def normalize_weights(weights):
+    """Validate a settings dict and fill in the optional sections."""
+    normalized = {
+        "offense": dict(weights.get("offense") or {}),
+        "defense": dict(weights.get("defense") or {}),
+        "position_bonus": {
+            position: dict(bonus) for position, bonus in (weights.get("position_bonus") or {}).items()
+        },
+    }
+    stat_indices(list(normalized["offense"]) + list(normalized["defense"]))
+    for bonus in normalized["position_bonus"].values():
+        stat_indices(list(bonus))
+    return normalized
+
+
+_weights_cache = {}
+_weights_lock = threading.Lock()
+
+
+def get_scoring_weights(db, scoring_id):
+    """(weights, fingerprint) for a scoring id; looked up once per ScoringSettings data version.
+
+    Fields resolve per row, so the lookup is cached; keying it on the data version also
+    picks up settings changed through another API worker.
+    """
+    if scoring_id in BUILTIN_SCORING:
+        version = None
+    else:
+        version = current_versions(db).get(ScoringSettings.__tablename__, 0)
+    with _weights_lock:
+        cached = _weights_cache.get(scoring_id)
+        if cached and cached[0] == version:
+            return cached[1]
+    if scoring_id in BUILTIN_SCORING:
+        weights = normalize_weights(BUILTIN_SCORING[scoring_id])
+    else:
+        settings = db.query(ScoringSettings).filter_by(scoring_id=scoring_id).first()
+        if not settings:
+            raise ValueError(f"Unknown scoring settings '{scoring_id}'")
+        weights = normalize_weights(json.loads(settings.weights))
+    fingerprint = hashlib.sha1(json.dumps(weights, sort_keys=True).encode()).hexdigest()
+    with _weights_lock:
+        _weights_cache[scoring_id] = (version, (weights, fingerprint))
+    return weights, fingerprint
+
+
+def weight_vector(weights):
+    vector = np.zeros(len(STAT_COLUMNS))
+    if weights:
+        vector[stat_indices(list(weights))] = list(weights.values())
+    return vector
+
+
+class SeasonPoints:
+    """Fantasy points for every (player, week) of a season under one scoring config."""
+
+    def __init__(self, player_index, points):
+        self.player_index = player_index
+        self.points = points  # shape (players, weeks); column w-1 is week w
+
+    def get(self, player_id, week):
+        row = self.player_index.get(player_id)
+        if row is None or not 1 <= week <= self.points.shape[1]:
+            return None
+        return float(self.points[row, week - 1])
+
+
+def score_season(values, weights, is_defense, positions):
+    """Vectorized scoring of a (players, weeks, stats) block.
+
+    Defensive players are scored with the defense weights when the config has any;
+    otherwise everyone uses the offense weights.
+    """
+    points = values @ weight_vector(weights["offense"])
+    if weights["defense"]:
+        defense_points = values @ weight_vector(weights["defense"])
+        points = np.where(is_defense[:, None], defense_points, points)
+    for position, bonus in weights["position_bonus"].items():
+        mask = positions == position
+        if mask.any():
+            points[mask] += values[mask] @ weight_vector(bonus)
+    return points
+
+
+_points_cache = {}
+_points_lock = threading.Lock()
+
+
+def _player_profiles(db, player_ids):
+    rows = (
+        db.query(DimPlayers.player_id, DimPlayers.position, DimPlayers.offense_defense_flag)
+        .filter(DimPlayers.player_id.in_(player_ids))
+        .all()
+    )
+    by_id = {row.player_id: row for row in rows}
+    positions = np.array([by_id[pid].position if pid in by_id else None for pid in player_ids], dtype=object)
+    is_defense = np.array(
+        [pid in by_id and by_id[pid].offense_defense_flag == "DEF" for pid in player_ids], dtype=bool
+    )
+    return positions, is_defense
+
+
+def get_season_points(db, scoring_id, season):
+    weights, fingerprint = get_scoring_weights(db, scoring_id)
+    cube = get_season_cube(db, season)
+    key = (scoring_id, fingerprint, season)
+
+    with _points_lock:
+        cached = _points_cache.get(key)
+        if cached and cached[0] == cube.version:
+            return cached[1]
+
+    version = cube.version
+    player_ids = list(cube.player_ids)
+    positions, is_defense = _player_profiles(db, player_ids)
+    values = cube.weekly_values()[:len(player_ids)]
+    result = SeasonPoints(dict(cube.player_index), score_season(values, weights, is_defense, positions))
+
+    with _points_lock:
+        _points_cache[key] = (version, result)
+    return result
+
+
+def invalidate_scoring(scoring_id):
+    with _weights_lock:
+        _weights_cache.pop(scoring_id, None)
+    with _points_lock:
+        for key in [key for key in _points_cache if key[0] == scoring_id]:
+            del _points_cache[key]
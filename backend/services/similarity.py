@@ -0,0 +1,122 @@
+import threading
+
+import numpy as np
+
+from backend.models.dim_players import DimPlayers
+from backend.services.weekly_stats_cube import GAMES_CHANNEL, get_season_cube, stat_indices
+
+# Per-game usage/production features compared for each stat group
+STAT_GROUPS = {
+    "usage": [
+        "targets", "receptions", "rush_attempts", "touches", "target_share",
+        "air_yards_share", "offense_pct", "qb_dropback",
+    ],
+    "receiving": [
+        "targets", "receptions", "receiving_yards", "receiving_air_yards", "yards_after_catch",
+        "receiving_touchdown", "target_share", "air_yards_share", "adot", "offense_pct",
+    ],
+    "rushing": [
+        "rush_attempts", "rushing_yards", "rush_touchdown", "first_down_rush", "touches",
+        "tackled_for_loss", "receptions", "offense_pct",
+    ],
+    "passing": [
+        "pass_attempts", "complete_pass", "passing_yards", "passing_air_yards", "pass_touchdown",
+        "interception", "qb_dropback", "qb_scramble", "shotgun", "rush_attempts",
+    ],
+    "defense": [
+        "solo_tackle", "assist_tackle", "tackle_with_assist", "sack", "qb_hit",
+        "interception", "fumble_forced", "defense_pct",
+    ],
+}
+
+METRICS = ("COSINE", "EUCLIDEAN")
+
+
+class SimilarityIndex:
+    """z-scored per-game stat vectors for one (season, stat group).
+
+    Rows are pre-normalised to unit length, so a cosine query is one matrix-vector
+    product over every player, and Euclidean distance reuses the cached squared norms.
+    """
+
+    def __init__(self, player_ids, features):
+        self.player_ids = player_ids
+        self.player_index = {pid: i for i, pid in enumerate(player_ids)}
+        mean = features.mean(axis=0)
+        std = features.std(axis=0)
+        std[std == 0] = 1.0
+        self.z = (features - mean) / std
+        self.sq_norms = np.einsum("ij,ij->i", self.z, self.z)
+        norms = np.sqrt(self.sq_norms)
+        norms[norms == 0] = 1.0
+        self.unit = self.z / norms[:, None]
+
+    def nearest(self, player_id, k, metric="COSINE"):
+        row = self.player_index.get(player_id)
+        if row is None:
+            return []
+        if metric == "COSINE":
+            distances = 1.0 - self.unit @ self.unit[row]
+        else:
+            d2 = self.sq_norms + self.sq_norms[row] - 2.0 * (self.z @ self.z[row])
+            distances = np.sqrt(np.maximum(d2, 0.0))
+        distances[row] = np.inf
+
+        k = min(k, len(self.player_ids) - 1)
+        if k <= 0:
+            return []
+        nearest = np.argpartition(distances, k - 1)[:k]
+        nearest = nearest[np.argsort(distances[nearest])]
+        return [(self.player_ids[i], float(distances[i])) for i in nearest]
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def build_index(cube, stat_group, min_games):
+    indices = stat_indices(STAT_GROUPS[stat_group])
+    with cube.lock:
+        totals = cube.prefix[:, -1, :].copy()
+        player_ids = list(cube.player_ids)
+    games = totals[:, GAMES_CHANNEL]
+    eligible = games >= max(min_games, 1)
+    features = totals[eligible][:, indices] / games[eligible][:, None]
+    return SimilarityIndex([pid for pid, keep in zip(player_ids, eligible) if keep], features)
+
+
+def get_similarity_index(db, season, stat_group, min_games=1):
+    if stat_group not in STAT_GROUPS:
+        raise ValueError(f"Unknown stat group '{stat_group}'; expected one of {', '.join(STAT_GROUPS)}")
+    cube = get_season_cube(db, season)
+    key = (season, stat_group, min_games)
+    with _indexes_lock:
+        cached = _indexes.get(key)
+        if cached and cached[0] == cube.version:
+            return cached[1]
+    version = cube.version
+    index = build_index(cube, stat_group, min_games)
+    with _indexes_lock:
+        _indexes[key] = (version, index)
+    return index
+
+
+def similar_players(db, player_id, season, k, stat_group, metric="COSINE", min_games=1):
+    if metric not in METRICS:
+        raise ValueError(f"Unknown metric '{metric}'; expected one of {', '.join(METRICS)}")
+    neighbours = get_similarity_index(db, season, stat_group, min_games).nearest(player_id, k, metric)
+    players = {
+        row.player_id: row
+        for row in db.query(DimPlayers.player_id, DimPlayers.player_name, DimPlayers.position)
+        .filter(DimPlayers.player_id.in_([pid for pid, _ in neighbours]))
+        .all()
+    } if neighbours else {}
+    return [
+        {
+            "player_id": pid,
+            "player_name": players[pid].player_name if pid in players else None,
+            "position": players[pid].position if pid in players else None,
+            "distance": distance,
+        }
+        for pid, distance in neighbours
+    ]
@@ -0,0 +1,45 @@
+import asyncio
+import threading
+
+
+class SingleFlight:
+    """Shares one in-flight execution between concurrent callers with the same key.
+
+    The first caller for a key starts the work as a task; callers arriving before it
+    finishes await the same task instead of starting their own. Callers are shielded from
+    each other, so one client disconnecting does not cancel the work for the rest.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.executed = 0
+        self.coalesced = 0
+
+    async def do(self, key, work):
+        """Await work() for `key`, joining a matching execution if one is running."""
+        with self._lock:
+            task = self._inflight.get(key)
+            if task is None:
+                task = asyncio.ensure_future(work())
+                self._inflight[key] = task
+                task.add_done_callback(lambda done: self._forget(key, done))
+                self.executed += 1
+            else:
+                self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def _forget(self, key, task):
+        with self._lock:
+            if self._inflight.get(key) is task:
+                del self._inflight[key]
+
+    def stats(self):
+        with self._lock:
+            total = self.executed + self.coalesced
+            return {
+                "executed": self.executed,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._inflight),
+                "coalesced_ratio": self.coalesced / total if total else 0.0,
+            }
@@ -0,0 +1,178 @@
+import argparse
+import json
+import os
+import shutil
+import threading
+import time
+
+import numpy as np
+from sqlalchemy import select
+
+from backend.models.player_weekly_stats import PlayerWeeklyStats
+
+# Directory holding published snapshots; unset means every worker builds its own cubes
+SNAPSHOT_ENV = "STAT_SNAPSHOT_DIR"
+POINTER = "CURRENT"
+# Older versions kept on disk so workers still attached to them can finish their swap
+KEEP_VERSIONS = 3
+# How often a worker re-reads the CURRENT pointer looking for a newer version
+CHECK_INTERVAL_SECONDS = 30
+
+
+def snapshot_root():
+    return os.getenv(SNAPSHOT_ENV)
+
+
+def _versions(root):
+    return sorted(int(name[1:]) for name in os.listdir(root) if name[:1] == "v" and name[1:].isdigit())
+
+
+def publish(root, seasons, stat_columns, data_versions=None):
+    """Write {season: (player_ids, prefix)} as a new immutable version and point CURRENT at it.
+
+    Arrays are plain .npy files so workers can np.load them with mmap_mode="r" and share the
+    page cache. The pointer is swapped with os.replace, so readers see either the old
+    version or the complete new one.
+    """
+    os.makedirs(root, exist_ok=True)
+    while True:
+        version = (_versions(root) or [0])[-1] + 1
+        directory = os.path.join(root, f"v{version}")
+        try:
+            os.makedirs(directory)
+            break
+        except FileExistsError:
+            # Another publisher took this version number
+            continue
+
+    manifest = {
+        "version": version,
+        "created_at": time.time(),
+        "stat_columns": list(stat_columns),
+        # Week versions the arrays were built from, so workers re-read only later changes
+        "data_versions": dict(data_versions or {}),
+        "seasons": {},
+    }
+    for season, (player_ids, prefix) in seasons.items():
+        np.save(os.path.join(directory, f"season_{season}_players.npy"), np.array(player_ids, dtype=str))
+        np.save(os.path.join(directory, f"season_{season}_prefix.npy"), np.ascontiguousarray(prefix))
+        manifest["seasons"][str(season)] = {"players": len(player_ids), "shape": list(prefix.shape)}
+    with open(os.path.join(directory, "manifest.json"), "w") as f:
+        json.dump(manifest, f, indent=2)
+
+    pointer_tmp = os.path.join(root, f"{POINTER}.{os.getpid()}.tmp")
+    with open(pointer_tmp, "w") as f:
+        f.write(f"v{version}\n")
+    os.replace(pointer_tmp, os.path.join(root, POINTER))
+
+    for old in _versions(root)[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(root, f"v{old}"), ignore_errors=True)
+    return version
+
+
+class Snapshot:
+    """One published version; season arrays are memory-mapped read-only on first use."""
+
+    def __init__(self, directory):
+        self.directory = directory
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+        self.version = manifest["version"]
+        self.stat_columns = manifest["stat_columns"]
+        self.data_versions = manifest.get("data_versions", {})
+        self.seasons = {int(season) for season in manifest["seasons"]}
+        self._arrays = {}
+        self._lock = threading.Lock()
+
+    def season(self, season):
+        """(player_ids, prefix) for a season, or None if it was not published."""
+        if season not in self.seasons:
+            return None
+        with self._lock:
+            if season not in self._arrays:
+                try:
+                    players = np.load(os.path.join(self.directory, f"season_{season}_players.npy"))
+                    prefix = np.load(os.path.join(self.directory, f"season_{season}_prefix.npy"), mmap_mode="r")
+                except FileNotFoundError:
+                    # Pruned after newer publishes: re-read CURRENT on the next lookup and let
+                    # the caller fall back to the database meanwhile
+                    expire_current()
+                    return None
+                self._arrays[season] = ([str(pid) for pid in players], prefix)
+            return self._arrays[season]
+
+
+_current = None
+_checked_at = 0.0
+_current_lock = threading.Lock()
+
+
+def current_snapshot(root=None):
+    """The version CURRENT points at, re-checked at most every CHECK_INTERVAL_SECONDS."""
+    global _current, _checked_at
+    root = root or snapshot_root()
+    if not root:
+        return None
+    with _current_lock:
+        if _current is not None and time.monotonic() - _checked_at < CHECK_INTERVAL_SECONDS:
+            return _current
+        _checked_at = time.monotonic()
+        try:
+            with open(os.path.join(root, POINTER)) as f:
+                directory = os.path.join(root, f.read().strip())
+            if _current is None or _current.directory != directory:
+                _current = Snapshot(directory)
+        except (OSError, ValueError, KeyError):
+            # Nothing published yet, or a version pruned mid-read: keep what we have
+            pass
+        return _current
+
+
+def expire_current():
+    """Make the next current_snapshot() re-read the CURRENT pointer."""
+    global _checked_at
+    with _current_lock:
+        _checked_at = 0.0
+
+
+def publish_from_db(db, root, seasons=None):
+    # The cube module reads snapshots through this one, so import it late
+    from backend.services.data_versions import current_versions
+    from backend.services.weekly_stats_cube import STAT_COLUMNS, SeasonCube, load_weekly_columns
+
+    # Read before the rows, like get_season_cube, so a write landing mid-publish is re-read
+    data_versions = {
+        key: version for key, version in current_versions(db).items()
+        if key.startswith(f"{PlayerWeeklyStats.__tablename__}:")
+    }
+    if seasons is None:
+        seasons = sorted(db.execute(select(PlayerWeeklyStats.season).distinct()).scalars())
+    arrays = {}
+    for season in seasons:
+        cube = SeasonCube(season)
+        cube.load(load_weekly_columns(db, season))
+        arrays[season] = (cube.player_ids, cube.prefix)
+    return publish(root, arrays, STAT_COLUMNS, data_versions)
+
+
+def main():
+    from backend.db import SessionLocal
+
+    parser = argparse.ArgumentParser(description="Publish a shared stat snapshot for the API workers.")
+    parser.add_argument("--root", default=snapshot_root(), help=f"snapshot directory (default ${SNAPSHOT_ENV})")
+    parser.add_argument("--seasons", type=int, nargs="*", help="seasons to include (default: all)")
+    args = parser.parse_args()
+    if not args.root:
+        parser.error(f"--root or {SNAPSHOT_ENV} is required")
+
+    db = SessionLocal()
+    try:
+        started = time.perf_counter()
+        version = publish_from_db(db, args.root, args.seasons or None)
+        print(f"Published snapshot v{version} to {args.root} in {time.perf_counter() - started:.2f}s")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,265 @@
+import itertools
+import threading
+
+import numpy as np
+from sqlalchemy import select
+
+from backend.models.player_weekly_stats import PlayerWeeklyStats
+from backend.services import stat_snapshot
+from backend.services.data_versions import current_versions, season_week_versions
+
+KEY_COLUMNS = ["player_id", "season", "season_type", "week", "team_id"]
+STAT_COLUMNS = [
+    column.name for column in PlayerWeeklyStats.__table__.columns
+    if column.name not in KEY_COLUMNS
+]
+STAT_INDEX = {name: i for i, name in enumerate(STAT_COLUMNS)}
+# Extra channel at the end of every cube: games played, so means are per game and not per week
+GAMES_CHANNEL = len(STAT_COLUMNS)
+
+# Cube versions are unique across cube objects, so a cube swapped in from a new snapshot
+# never matches a cache entry made from the one it replaced
+_versions = itertools.count(1)
+
+
+def load_weekly_columns(db, season, weeks=None):
+    """Pull one season of PlayerWeeklyStats (or just `weeks` of it) as columns (NULL stats come back as 0)."""
+    columns = [getattr(PlayerWeeklyStats, name) for name in KEY_COLUMNS + STAT_COLUMNS]
+    query = select(*columns).where(PlayerWeeklyStats.season == season)
+    if weeks is not None:
+        query = query.where(PlayerWeeklyStats.week.in_(weeks))
+    rows = db.execute(query).all()
+
+    n_keys = len(KEY_COLUMNS)
+    values = np.array([row[n_keys:] for row in rows], dtype=np.float64)
+    return {
+        "player_id": np.array([row[0] for row in rows], dtype=object),
+        "season_type": np.array([row[2] for row in rows], dtype=object),
+        "week": np.array([row[3] for row in rows], dtype=np.int64),
+        "team_id": np.array([row[4] for row in rows], dtype=object),
+        "values": np.nan_to_num(values.reshape(len(rows), len(STAT_COLUMNS))),
+    }
+
+
+def stat_indices(stats):
+    unknown = [name for name in stats if name not in STAT_INDEX]
+    if unknown:
+        raise ValueError(f"Unknown PlayerWeeklyStats column(s): {', '.join(unknown)}")
+    return [STAT_INDEX[name] for name in stats]
+
+
+class SeasonCube:
+    """Per-player prefix sums over the weeks of one season.
+
+    prefix[p, w, s] is player p's total of stat s over weeks 1..w (week 0 is all zeros),
+    so the sum over any week range is the difference of two lookups.
+    """
+
+    def __init__(self, season):
+        self.season = season
+        self.player_ids = []
+        self.player_index = {}
+        self.prefix = np.zeros((0, 1, GAMES_CHANNEL + 1))
+        # {week: data version} of the rows the cube holds, checked by get_season_cube
+        self.week_versions = {}
+        # Bumped on every change so values derived from the cube know when to recompute
+        self.version = next(_versions)
+        self.lock = threading.Lock()
+        # Set when the prefix is a read-only view of a published snapshot
+        self.snapshot_version = None
+
+    @classmethod
+    def from_snapshot(cls, season, player_ids, prefix, snapshot_version, week_versions=None):
+        cube = cls(season)
+        cube.player_ids = list(player_ids)
+        cube.player_index = {pid: i for i, pid in enumerate(cube.player_ids)}
+        cube.prefix = prefix
+        cube.snapshot_version = snapshot_version
+        cube.week_versions = dict(week_versions or {})
+        return cube
+
+    @property
+    def max_week(self):
+        return self.prefix.shape[1] - 1
+
+    def _rows_for(self, player_ids):
+        missing = [pid for pid in dict.fromkeys(player_ids) if pid not in self.player_index]
+        if missing:
+            for pid in missing:
+                self.player_index[pid] = len(self.player_ids)
+                self.player_ids.append(pid)
+            grow = np.zeros((len(missing),) + self.prefix.shape[1:])
+            self.prefix = np.concatenate([self.prefix, grow])
+        return np.array([self.player_index[pid] for pid in player_ids], dtype=np.intp)
+
+    def _ensure_week(self, week):
+        if week > self.max_week:
+            # New weeks start out carrying the running totals forward
+            tail = np.repeat(self.prefix[:, -1:, :], week - self.max_week, axis=1)
+            self.prefix = np.concatenate([self.prefix, tail], axis=1)
+
+    def apply(self, player_ids, weeks, values, sign=1.0):
+        """Add weekly rows to the cube (sign=-1 takes them back out)."""
+        if len(player_ids) == 0:
+            return
+        with self.lock:
+            weekly = self._weekly_deltas(player_ids, weeks, values, sign)
+            self.prefix += np.cumsum(weekly, axis=1)
+            self.version = next(_versions)
+
+    def replace_weeks(self, weeks, columns):
+        """Swap the cube's rows for `weeks` with `columns`, freshly read for just those weeks."""
+        if not weeks:
+            return
+        with self.lock:
+            weekly = self._weekly_deltas(columns["player_id"], columns["week"], columns["values"])
+            self._ensure_week(max(weeks))
+            if weekly.shape[1] < self.prefix.shape[1]:
+                weekly = np.pad(weekly, ((0, 0), (0, self.prefix.shape[1] - weekly.shape[1]), (0, 0)))
+            weeks = np.asarray(weeks, dtype=np.intp)
+            # Take out what each week held before the new rows go in
+            weekly[:, weeks] -= self.prefix[:, weeks] - self.prefix[:, weeks - 1]
+            self.prefix += np.cumsum(weekly, axis=1)
+            self.version = next(_versions)
+
+    def _weekly_deltas(self, player_ids, weeks, values, sign=1.0):
+        """Per-week (not yet cumulative) additions for rows, growing the cube to fit them."""
+        if not self.prefix.flags.writeable:
+            # First write to a snapshot-backed cube: this worker takes a private copy
+            self.prefix = np.array(self.prefix)
+        if len(player_ids) == 0:
+            return np.zeros_like(self.prefix)
+        rows = self._rows_for(list(player_ids))
+        weeks = np.asarray(weeks, dtype=np.intp)
+        self._ensure_week(int(weeks.max()))
+
+        deltas = np.empty((rows.size, GAMES_CHANNEL + 1))
+        deltas[:, :GAMES_CHANNEL] = values
+        deltas[:, GAMES_CHANNEL] = 1.0
+        deltas *= sign
+
+        weekly = np.zeros_like(self.prefix)
+        np.add.at(weekly, (rows, weeks), deltas)
+        return weekly
+
+    def weekly_values(self):
+        """Per-week stat values, shape (players, weeks, stats); column w-1 is week w."""
+        with self.lock:
+            return np.diff(self.prefix[:, :, :GAMES_CHANNEL], axis=1)
+
+    def weekly_games(self):
+        """1.0 where the player has a row for the week, shape (players, weeks)."""
+        with self.lock:
+            return np.diff(self.prefix[:, :, GAMES_CHANNEL], axis=1)
+
+    def load(self, columns):
+        self.apply(columns["player_id"], columns["week"], columns["values"])
+
+    def window(self, player_ids, through_week, stats, games=None):
+        """Totals and per-game means over a player's last `games` games up to through_week.
+
+        With games=None the window is the whole season to date.
+        """
+        indices = stat_indices(stats)
+        with self.lock:
+            through = max(0, min(through_week, self.max_week))
+            known = np.array([pid in self.player_index for pid in player_ids], dtype=bool)
+            if not known.any():
+                return [self._empty_window(pid, through, stats) for pid in player_ids]
+            rows = np.array([self.player_index.get(pid, 0) for pid in player_ids], dtype=np.intp)
+
+            played = self.prefix[rows, :through + 1, GAMES_CHANNEL]
+            games_to_date = played[:, -1]
+            if games is None:
+                start_week = np.ones(rows.size, dtype=np.intp)
+            else:
+                # played is non-decreasing, so counting the weeks at or below the cut-off
+                # finds the first week inside the window
+                cutoff = games_to_date - games
+                start_week = np.maximum((played <= cutoff[:, None]).sum(axis=1), 1)
+            first_game_week = np.maximum(
+                (played <= (played[np.arange(rows.size), start_week - 1])[:, None]).sum(axis=1), 1
+            )
+
+            end = self.prefix[rows, through]
+            begin = self.prefix[rows, start_week - 1]
+            totals = end - begin
+
+        results = []
+        for i, pid in enumerate(player_ids):
+            n_games = int(totals[i, GAMES_CHANNEL]) if known[i] else 0
+            if not n_games:
+                results.append(self._empty_window(pid, through, stats))
+                continue
+            results.append({
+                "player_id": pid,
+                "season": self.season,
+                "from_week": int(first_game_week[i]),
+                "through_week": through,
+                "games": n_games,
+                "stats": [
+                    {"stat": name, "total": float(totals[i, idx]), "mean": float(totals[i, idx]) / n_games}
+                    for name, idx in zip(stats, indices)
+                ],
+            })
+        return results
+
+    def _empty_window(self, player_id, through_week, stats):
+        return {
+            "player_id": player_id,
+            "season": self.season,
+            "from_week": None,
+            "through_week": through_week,
+            "games": 0,
+            "stats": [{"stat": name, "total": 0.0, "mean": None} for name in stats],
+        }
+
+
+_cubes = {}
+_season_locks = {}
+_cubes_lock = threading.Lock()
+
+
+def _season_lock(season):
+    # One lock per season, so building or syncing one season never stalls queries on another
+    with _cubes_lock:
+        return _season_locks.setdefault(season, threading.Lock())
+
+
+def _from_snapshot(season, cube):
+    """A cube over the current published snapshot, if there is one newer than `cube`."""
+    snapshot = stat_snapshot.current_snapshot()
+    if snapshot is None or snapshot.stat_columns != STAT_COLUMNS:
+        return None
+    if cube is not None and cube.snapshot_version == snapshot.version:
+        return None
+    arrays = snapshot.season(season)
+    if arrays is None:
+        return None
+    week_versions = season_week_versions(snapshot.data_versions, PlayerWeeklyStats.__tablename__, season)
+    return SeasonCube.from_snapshot(season, *arrays, snapshot.version, week_versions)
+
+
+def get_season_cube(db, season):
+    with _season_lock(season):
+        cube = _cubes.get(season)
+        # With a published snapshot, workers map the same read-only arrays instead of each
+        # building a copy from the DB, and move to a newer version once one is published
+        attached = _from_snapshot(season, cube)
+        if attached is not None:
+            cube = attached
+            _cubes[season] = cube
+        # Read before any rows, so a write landing mid-load is picked up on the next call
+        week_versions = season_week_versions(current_versions(db), PlayerWeeklyStats.__tablename__, season)
+        if cube is None:
+            cube = SeasonCube(season)
+            cube.load(load_weekly_columns(db, season))
+            _cubes[season] = cube
+        else:
+            # ETL loads and mutations bump the version of each week they touch; only those
+            # weeks are read again
+            changed = sorted(week for week, version in week_versions.items() if cube.week_versions.get(week) != version)
+            if changed:
+                cube.replace_weeks(changed, load_weekly_columns(db, season, weeks=changed))
+        cube.week_versions = week_versions
+    return cube
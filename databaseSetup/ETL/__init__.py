@@ -0,0 +1 @@
+"""ETL pipeline: python -m databaseSetup.ETL (see pipeline.py for the stages)."""
@@ -0,0 +1,84 @@
+"""Settings shared by every ETL stage, read once from the environment (.env)."""
+import os
+import sys
+
+from dotenv import load_dotenv
+from sqlalchemy import create_engine, text
+
+from backend.models.data_versions import DataVersions
+from backend.services.data_versions import week_key
+
+# --- Load environment variables from .env file ---
+load_dotenv()
+
+# --- Database Connection Configuration ---
+DB_USER = os.getenv('DB_USER')
+DB_PASSWORD = os.getenv('DB_PASSWORD')
+DB_HOST = os.getenv('DB_HOST')
+DB_PORT = os.getenv('DB_PORT', 3306)
+DB_NAME = os.getenv('DB_NAME')
+
+DATABASE_URL = (
+    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
+)
+
+# Set ETL_LOCAL_INFILE=0 to load with batched INSERTs instead of LOAD DATA LOCAL INFILE
+LOCAL_INFILE = os.getenv('ETL_LOCAL_INFILE', '1') != '0'
+
+# --- File Path Configuration ---
+# CSV exports live in databaseSetup/myData unless ETL_DATA_DIR points elsewhere
+DATA_DIR = os.getenv('ETL_DATA_DIR', os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'myData'))
+
+
+def data_file(name):
+    return os.path.join(DATA_DIR, name)
+
+
+def check_settings():
+    """Exit early when a database setting is missing from the environment."""
+    if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]):
+        print("Error: One or more database environment variables are not set. Check your .env file.")
+        print("DB_USER:", DB_USER)
+        print("DB_PASSWORD:", DB_PASSWORD)
+        print("DB_HOST:", DB_HOST)
+        print("DB_NAME:", DB_NAME)
+        sys.exit(1)
+
+
+def get_engine(**options):
+    # Bulk loads need the client side of LOAD DATA LOCAL INFILE enabled (see loading.py)
+    return create_engine(DATABASE_URL, connect_args={'local_infile': LOCAL_INFILE}, **options)
+
+
+def check_connection(engine):
+    try:
+        with engine.connect() as connection:
+            result = connection.execute(text("SELECT 1")).scalar()
+            if result == 1:
+                print(f"Successfully connected to MariaDB database '{DB_NAME}'!")
+            else:
+                print("Connection test returned unexpected result.")
+    except Exception as e:
+        print(f"Error connecting to the database: {e}")
+        sys.exit(1)
+
+
+def bump_data_version(engine, table_name, weeks=(), reloaded=False):
+    """Bump the table's data version so cached API reads (ETags) are revalidated.
+
+    weeks: (season, week) pairs the load wrote, whose own versions are bumped too so the
+    API's stat cubes re-read just those weeks. reloaded: the whole table was replaced, so
+    every week version moves.
+    """
+    DataVersions.__table__.create(engine, checkfirst=True)
+    upsert = text(
+        "INSERT INTO DataVersions (table_name, version) VALUES (:table_name, 1) "
+        "ON DUPLICATE KEY UPDATE version = version + 1"
+    )
+    with engine.begin() as connection:
+        if reloaded:
+            connection.execute(text(
+                "UPDATE DataVersions SET version = version + 1 WHERE table_name LIKE :prefix"
+            ), {"prefix": f"{table_name}:%"})
+        keys = [table_name] + sorted({week_key(table_name, season, week) for season, week in weeks})
+        connection.execute(upsert, [{"table_name": key} for key in keys])
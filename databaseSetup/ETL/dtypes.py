@@ -0,0 +1,53 @@
+"""Column dtypes for the raw CSV exports, derived from the ORM models.
+
+read_csv gets the dtypes up front instead of inferring every column and recasting it
+after the merge: Integer columns read as nullable Int32, Float columns as float32 (MySQL
+FLOAT is single precision anyway), and the few low-cardinality strings as categoricals.
+Columns a table has no place for are never parsed.
+"""
+from sqlalchemy import Float, Integer
+
+from .streaming import COLUMN_RENAMES
+
+# Repeated on every row with a handful of distinct values
+CATEGORICAL_COLUMNS = ('team_id', 'season_type', 'position')
+
+
+def column_dtype(column):
+    if column.name in CATEGORICAL_COLUMNS:
+        return 'category'
+    if isinstance(column.type, Integer):
+        return 'Int32'
+    if isinstance(column.type, Float):
+        return 'float32'
+    return 'str'
+
+
+def table_dtypes(model):
+    """{column name: pandas dtype} for every column of the model's table."""
+    return {column.name: column_dtype(column) for column in model.__table__.columns}
+
+
+def csv_dtypes(model, extra_columns=None):
+    """read_csv keyword arguments (dtype, usecols) for a raw export feeding `model`.
+
+    `extra_columns` maps columns the stage needs that the table does not keep to their
+    dtype. Raw names ('team') are used, so the options apply to the files as exported.
+    """
+    raw_names = {table_name: raw_name for raw_name, table_name in COLUMN_RENAMES.items()}
+    dtype = {raw_names.get(name, name): value for name, value in table_dtypes(model).items()}
+    dtype.update(extra_columns or {})
+    return {'dtype': dtype, 'usecols': lambda name: name in dtype}
+
+
+def cast_to_model(df, model, keep_missing=(), fill_value=0):
+    """Fill the numeric columns the outer merge left empty and cast them to the model dtypes.
+
+    Columns in `keep_missing` (the merge keys) keep their gaps so the primary key check
+    still drops those rows.
+    """
+    dtypes = {
+        name: value for name, value in table_dtypes(model).items()
+        if name in df.columns and name not in keep_missing and value in ('Int32', 'float32')
+    }
+    return df.fillna({name: fill_value for name in dtypes}).astype(dtypes)
@@ -0,0 +1,120 @@
+import argparse
+import pandas as pd
+from sqlalchemy import bindparam, text
+
+from backend.models.defense_vs_position import DefenseVsPosition
+from .config import bump_data_version, check_connection, check_settings, get_engine
+
+# --- Stage Configuration ---
+POSITIONS = ('QB', 'RB', 'WR', 'TE')
+# Games in each defense's rolling average
+ROLLING_WEEKS = 4
+
+# Fantasy points each player scored, credited to the defense on the other side of the game
+weekly_allowed_sql = text("""
+    SELECT p.season, p.week, d.position, opp.team_id AS team_id, p.team_id AS opponent_id,
+           COUNT(*) AS players,
+           SUM(COALESCE(p.fantasy_points_ppr, 0)) AS fantasy_points_ppr,
+           SUM(COALESCE(p.fantasy_points_standard, 0)) AS fantasy_points_standard
+    FROM PlayerWeeklyStats p
+    JOIN DimPlayers d ON d.player_id = p.player_id
+    JOIN TeamWeeklyStats t
+      ON t.team_id = p.team_id AND t.season = p.season AND t.week = p.week AND t.season_type = p.season_type
+    JOIN TeamWeeklyStats opp ON opp.game_id = t.game_id AND opp.team_id <> t.team_id
+    WHERE p.season = :season AND p.week >= :from_week AND d.position IN :positions
+    GROUP BY p.season, p.week, d.position, opp.team_id, p.team_id
+""").bindparams(bindparam('positions', expanding=True))
+
+loaded_sql = text("""
+    SELECT season, week, position, team_id, opponent_id, players, fantasy_points_ppr, fantasy_points_standard
+    FROM DefenseVsPosition
+    WHERE season = :season AND week < :from_week
+""")
+
+
+def run(engine, only_season=None, start_week=None, full=False):
+    """Recompute the weeks newer than the last loaded one, or the weeks asked for."""
+    print("\nRefreshing DefenseVsPosition...")
+    try:
+        # 1. Work out which weeks need (re)computing; the first run creates the table
+        DefenseVsPosition.__table__.create(engine, checkfirst=True)
+        with engine.connect() as connection:
+            available = dict(connection.execute(text(
+                "SELECT season, MAX(week) FROM PlayerWeeklyStats GROUP BY season"
+            )).all())
+            loaded = dict(connection.execute(text(
+                "SELECT season, MAX(week) FROM DefenseVsPosition GROUP BY season"
+            )).all())
+
+        refresh = {}
+        for season, last_week in sorted(available.items()):
+            if only_season is not None and season != only_season:
+                continue
+            if full:
+                refresh[season] = 1
+            elif start_week is not None:
+                refresh[season] = start_week
+            elif season not in loaded:
+                refresh[season] = 1
+            elif last_week > loaded[season]:
+                # The last loaded week is recomputed too, in case it was loaded part-way through
+                refresh[season] = loaded[season]
+        if not refresh:
+            print("DefenseVsPosition is up to date.")
+
+        rows_written = 0
+        for season, from_week in refresh.items():
+            # 2. Aggregate only the new weeks; earlier weeks come back from the table itself
+            with engine.connect() as connection:
+                df_new = pd.read_sql(weekly_allowed_sql, connection,
+                                     params={'season': season, 'from_week': from_week, 'positions': POSITIONS})
+                df_prior = pd.read_sql(loaded_sql, connection, params={'season': season, 'from_week': from_week})
+            print(f"Season {season}: {len(df_new)} new rows from week {from_week}, {len(df_prior)} earlier rows")
+            if df_new.empty:
+                continue
+
+            # 3. Rolling and season-to-date means over each defense's games against the position
+            df_all = pd.concat([df_prior, df_new], ignore_index=True).sort_values(['team_id', 'position', 'week'])
+            grouped = df_all.groupby(['team_id', 'position'])
+            for scoring in ('ppr', 'standard'):
+                points = grouped[f'fantasy_points_{scoring}']
+                df_all[f'rolling_points_{scoring}'] = points.transform(
+                    lambda s: s.rolling(ROLLING_WEEKS, min_periods=1).mean())
+                df_all[f'season_points_{scoring}'] = points.transform(lambda s: s.expanding().mean())
+            df_to_upload_final = df_all[df_all['week'] >= from_week]
+
+            # 4. Replace the refreshed weeks in one transaction
+            with engine.begin() as connection:
+                connection.execute(text(
+                    "DELETE FROM DefenseVsPosition WHERE season = :season AND week >= :from_week"
+                ), {'season': season, 'from_week': from_week})
+                df_to_upload_final.to_sql('DefenseVsPosition', con=connection, if_exists='append', index=False,
+                                          chunksize=1000)
+            rows_written += len(df_to_upload_final)
+
+        if rows_written:
+            bump_data_version(engine, "DefenseVsPosition")
+            print(f"\nDefenseVsPosition refreshed: {rows_written} rows written.")
+
+    except Exception as e:
+        print(f"An unexpected error occurred during DefenseVsPosition ETL: {e}")
+        raise  # Re-raise the exception after printing for debugging
+
+    print("\nETL process for DefenseVsPosition completed.")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Materialize fantasy points allowed by each defense to each position.")
+    parser.add_argument('--season', type=int, help="only refresh this season")
+    parser.add_argument('--from-week', type=int, help="recompute from this week on (default: the last loaded week)")
+    parser.add_argument('--full', action='store_true', help="recompute every week of every season")
+    args = parser.parse_args()
+
+    check_settings()
+    engine = get_engine()
+    check_connection(engine)
+    run(engine, args.season, args.from_week, args.full)
+
+
+if __name__ == "__main__":
+    main()
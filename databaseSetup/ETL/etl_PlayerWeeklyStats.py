@@ -1,68 +1,24 @@
-import os
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine, text
-import pymysql
-from dotenv import load_dotenv
-
-# --- Load environment variables from .env file ---
-load_dotenv()
-
-# --- Database Connection Configuration ---
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = os.getenv('DB_PORT')
-DB_NAME = os.getenv('DB_NAME')
-
-# Ensure all critical variables are loaded
-if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]):
-    print("Error: One or more database environment variables are not set. Check your .env file.")
-    print("DB_USER:", DB_USER)
-    print("DB_PASSWORD:", DB_PASSWORD)
-    print("DB_HOST:", DB_HOST)
-    print("DB_NAME:", DB_NAME)
-    import sys
-
-    sys.exit(1)
-
-DATABASE_URL = (
-    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
-)
-
-try:
-    engine = create_engine(DATABASE_URL)
-    with engine.connect() as connection:
-        result = connection.execute(text("SELECT 1")).scalar()
-        if result == 1:
-            print(f"Successfully connected to MariaDB database '{DB_NAME}'!")
-        else:
-            print("Connection test returned unexpected result.")
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    import sys
-
-    sys.exit(1)
-
-# print("\nDatabase connection setup complete. You can now use the 'engine' object for ETL operations.")
-
-# --- File Path Configuration ---
-cwd = os.getcwd()
-parent_dir = os.path.dirname(cwd)
-sub_directory = "myData"
-file_weekly_offense = 'my_player_weekly_stats_offense.csv'
-file_weekly_defense = 'my_player_weekly_stats_defense.csv'
-
-target_folder = os.path.join(parent_dir, sub_directory)
-target_file_weekly_offense = os.path.join(target_folder, file_weekly_offense)
-target_file_weekly_defense = os.path.join(target_folder, file_weekly_defense)
-
-# --- ETL for PlayerWeeklyStats ---
-print("\nLoading PlayerWeeklyStats...")
-try:
-    # 1. Read Raw Data
-    df_weekly_off_raw = pd.read_csv(target_file_weekly_offense)
-    df_weekly_def_raw = pd.read_csv(target_file_weekly_defense)
+
+from backend.models.player_weekly_stats import PlayerWeeklyStats
+from .config import bump_data_version, data_file
+from .dtypes import cast_to_model, csv_dtypes
+from .reconcile import combine_shared, resolve_season_type
+from .loading import insert_new_rows
+from .shadow import ShadowTable, shadow_swap
+from .streaming import read_paired
+from .watermarks import advance_watermark, latest_in, read_watermark, rows_since
+
+DB_PRIMARY_KEY_COLS = ['player_id', 'season', 'season_type', 'week']
+# Rows sharing these raw columns must be merged together; streaming partitions on them
+PARTITION_KEYS = ['player_id', 'season', 'week']
+# Typed reads of only the columns PlayerWeeklyStats keeps
+READ_OPTIONS = csv_dtypes(PlayerWeeklyStats)
+
+
+def transform(df_weekly_off_raw, df_weekly_def_raw):
+    """Merge, clean and deduplicate one offense/defense pair; returns df_merged_weekly."""
     # print("\nOriginal Offense shape: ", df_weekly_off_raw.shape)
     # print("\nOriginal Offense Columns:")
     # print(df_weekly_off_raw.columns.tolist())
@@ -150,46 +106,7 @@ try:
     # Resolve 'season_type' conflict (Reg > Post)
     # print("\n--- Consolidating 'season_type' (Regular > Postseason preference) ---")
 
-    # Replace NaN with a consistent placeholder for easier comparison for season_type_x and season_type_y
-    df_merged_weekly['season_type_x'] = df_merged_weekly['season_type_x'].fillna('')
-    df_merged_weekly['season_type_y'] = df_merged_weekly['season_type_y'].fillna('')
-
-
-    def resolve_season_type(row):
-        off_type = str(row['season_type_x']).strip().lower()
-        def_type = str(row['season_type_y']).strip().lower()
-
-        if 'regular' in [off_type, def_type]:
-            return 'Reg'  # Use 'Reg' to match DB 'Reg' and 'Post'
-        elif 'postseason' in [off_type, def_type]:
-            return 'Post'  # Use 'Post' to match DB 'Reg' and 'Post'
-        elif off_type:  # if only offense has a season type
-            return off_type.capitalize()
-        elif def_type:  # if only defense has a season type
-            return def_type.capitalize()
-        else:
-            return 'Unknown'  # if both are empty/NaN
-
-
-    if 'season_type_x' in df_merged_weekly.columns and 'season_type_y' in df_merged_weekly.columns:
-        df_merged_weekly['season_type'] = df_merged_weekly.apply(resolve_season_type, axis=1)
-        df_merged_weekly.drop(columns=['season_type_x', 'season_type_y'], inplace=True)
-        # print("Consolidated 'season_type' from '_x' and '_y' columns.")
-    elif 'season_type_x' in df_merged_weekly.columns:
-        df_merged_weekly.rename(columns={'season_type_x': 'season_type'}, inplace=True)
-        # Handle cases where season_type_x might be NaN for def-only players after outer merge
-        df_merged_weekly['season_type'] = df_merged_weekly['season_type'].fillna('Unknown').astype(str).apply(
-            lambda x: x.capitalize())
-        # print("Renamed 'season_type_x' to 'season_type'.")
-    elif 'season_type_y' in df_merged_weekly.columns:
-        df_merged_weekly.rename(columns={'season_type_y': 'season_type'}, inplace=True)
-        # Handle cases where season_type_y might be NaN for off-only players after outer merge
-        df_merged_weekly['season_type'] = df_merged_weekly['season_type'].fillna('Unknown').astype(str).apply(
-            lambda x: x.capitalize())
-        # print("Renamed 'season_type_y' to 'season_type'.")
-    else:
-        df_merged_weekly['season_type'] = 'Unknown'  # Fallback if neither exists (unlikely with current data)
-        # print("No 'season_type' column found, created 'Unknown' placeholder.")
+    df_merged_weekly = resolve_season_type(df_merged_weekly)
 
     # print("Sample of consolidated season_type:")
     # print(df_merged_weekly[['player_id', 'season', 'week', 'season_type']].head().to_markdown(index=False,
@@ -198,87 +115,10 @@ try:
 
     # --- Consolidate Shared Numeric Stats (summing _x and _y) ---
     # print("\n--- Consolidating Shared Numeric Stats (Summing _x and _y) ---")
-    for stat_name in shared_stats_cols:
-        off_col = f"{stat_name}_x"
-        def_col = f"{stat_name}_y"
-
-        if off_col in df_merged_weekly.columns and def_col in df_merged_weekly.columns:
-            # Fill NaNs with 0 before summing to treat missing as 0 contribution
-            df_merged_weekly[stat_name] = df_merged_weekly[off_col].fillna(0) + df_merged_weekly[def_col].fillna(0)
-            df_merged_weekly.drop(columns=[off_col, def_col], inplace=True)
-        #        print(f"Consolidated '{off_col}' and '{def_col}' into '{stat_name}' by summing.")
-        elif off_col in df_merged_weekly.columns:
-            df_merged_weekly.rename(columns={off_col: stat_name}, inplace=True)
-        #        print(f"Renamed '{off_col}' to '{stat_name}'.")
-        elif def_col in df_merged_weekly.columns:
-            df_merged_weekly.rename(columns={def_col: stat_name}, inplace=True)
-    #        print(f"Renamed '{def_col}' to '{stat_name}'.")
-
-    # --- Fill remaining NaN numeric columns with 0.0 ---
-    # Get a list of all columns that are not merge_keys or season_type
-    numeric_cols_to_fill_na = [
-        col for col in df_merged_weekly.columns
-        if col not in merge_keys and col != 'season_type' and pd.api.types.is_numeric_dtype(df_merged_weekly[col])
-    ]
-
-    # print(f"\n--- Filling NaN values in numeric stat columns with 0.0 ({len(numeric_cols_to_fill_na)} columns) ---")
-    for col in numeric_cols_to_fill_na:
-        df_merged_weekly[col] = pd.to_numeric(df_merged_weekly[col], errors='coerce').fillna(0.0)
-        # Ensure any non-numeric values converted to NaN are now 0.0
-
-    # --- Cast numeric columns to appropriate types (int for counts, float for decimals) ---
-    # print("\n--- Casting numeric columns to appropriate types ---")
-
-    # Define columns that should ideally be integers
-    integer_stat_cols = [
-        # Merge Keys (season, week will be handled below with PK casting for consistency)
-        # Offensive Stats (from off_stats_only_cols)
-        'shotgun', 'no_huddle', 'qb_dropback', 'qb_scramble', 'pass_attempts',
-        'complete_pass', 'incomplete_pass', 'rush_attempts', 'tackled_for_loss',
-        'first_down_pass', 'first_down_rush', 'third_down_converted',
-        'third_down_failed', 'fourth_down_converted', 'fourth_down_failed',
-        'rush_touchdown', 'pass_touchdown', 'receptions', 'targets',
-        'receiving_touchdown', 'touches', 'total_tds', 'offense_snaps', 'team_offense_snaps',
-        # Defensive Stats (from def_stats_only_cols)
-        'solo_tackle', 'assist_tackle', 'tackle_with_assist', 'qb_hit',  # sack handled as float due to potential .5
-        'defense_snaps', 'team_defense_snaps',
-        # Shared Stats (after consolidation, which are generally counts)
-        'safety', 'interception', 'fumble', 'fumble_lost', 'fumble_forced',
-        'fumble_not_forced', 'fumble_out_of_bounds', 'def_touchdown',
-        'defensive_two_point_attempt', 'defensive_two_point_conv',
-        'defensive_extra_point_attempt', 'defensive_extra_point_conv'
-    ]
-
-    # 'sack' can be fractional (e.g., 0.5 sacks), so it should generally be float.
-    # Ensure it's not in the integer list.
-    if 'sack' in integer_stat_cols:
-        integer_stat_cols.remove(
-            'sack')  # This is a safety check; it should not be there if def_stats_only_cols is defined correctly.
-
-    # Convert to integer where appropriate
-    for col in integer_stat_cols:
-        if col in df_merged_weekly.columns:
-            # Convert to float first to handle NaNs, then to Int64 (pandas nullable integer)
-            # then to regular int if desired for DB. Using Int64 for robust NaN handling before DB upload.
-            df_merged_weekly[col] = df_merged_weekly[col].astype(float).fillna(0).astype(
-                'Int64')  # Using 'Int64' for nullable integer
-            # print(f"  - Converted '{col}' to Int64.") # Uncomment for verbose output
-
-    # Ensure other numeric columns are float (e.g., percentages, averages, yards, sack)
-    float_stat_cols = [
-        col for col in df_merged_weekly.columns
-        if
-        col not in integer_stat_cols and col not in merge_keys and col != 'season_type' and pd.api.types.is_numeric_dtype(
-            df_merged_weekly[col])
-    ]
-    # Add 'sack' explicitly if it's a column and not already in integer_stat_cols
-    if 'sack' in df_merged_weekly.columns and 'sack' not in integer_stat_cols and 'sack' not in float_stat_cols:
-        float_stat_cols.append('sack')
+    df_merged_weekly = combine_shared(df_merged_weekly, shared_stats_cols)
 
-    for col in float_stat_cols:
-        if col in df_merged_weekly.columns:
-            df_merged_weekly[col] = df_merged_weekly[col].astype(float)
-            # print(f"  - Converted '{col}' to float.") # Uncomment for verbose output
+    # --- Fill remaining NaN numeric columns with 0 and cast to the PlayerWeeklyStats column types ---
+    df_merged_weekly = cast_to_model(df_merged_weekly, PlayerWeeklyStats, keep_missing=merge_keys)
 
     # Ensure core ID columns have no nulls for PK and are string type
     initial_rows_pre_pk_drop = len(df_merged_weekly)
@@ -293,11 +133,10 @@ try:
 
     # --- IMPORTANT: Correctly define the primary key columns as they are in your MariaDB table ---
     # Your MariaDB's PRIMARY KEY is: (`player_id`,`season`,`season_type`,`week`)
-    db_primary_key_cols = ['player_id', 'season', 'season_type', 'week']
 
     # --- Convert all primary key components to string for consistent comparison ---
     # This is crucial for `duplicated()` and `isin()` to work correctly
-    for col in db_primary_key_cols:
+    for col in DB_PRIMARY_KEY_COLS:
         if col in df_merged_weekly.columns:
             df_merged_weekly[col] = df_merged_weekly[col].astype(str)
         else:
@@ -306,21 +145,21 @@ try:
 
     # --- Deduplicate on the actual database primary key columns *within the DataFrame* ---
     initial_rows_pre_dedupe_df = len(df_merged_weekly)
-    internal_duplicates_df = df_merged_weekly[df_merged_weekly.duplicated(subset=db_primary_key_cols, keep=False)]
+    internal_duplicates_df = df_merged_weekly[df_merged_weekly.duplicated(subset=DB_PRIMARY_KEY_COLS, keep=False)]
 
     if not internal_duplicates_df.empty:
         print(
-            f"\n--- CRITICAL: Found {len(internal_duplicates_df)} rows with duplicate primary keys within the DataFrame ({', '.join(db_primary_key_cols)})! ---")
+            f"\n--- CRITICAL: Found {len(internal_duplicates_df)} rows with duplicate primary keys within the DataFrame ({', '.join(DB_PRIMARY_KEY_COLS)})! ---")
         print("These are the problematic rows (showing first 20):")
-        print(internal_duplicates_df.sort_values(by=db_primary_key_cols).head(20).to_markdown(index=False))
+        print(internal_duplicates_df.sort_values(by=DB_PRIMARY_KEY_COLS).head(20).to_markdown(index=False))
 
         # Drop these duplicates, keeping the first occurrence
-        df_merged_weekly.drop_duplicates(subset=db_primary_key_cols, keep='first', inplace=True)
+        df_merged_weekly.drop_duplicates(subset=DB_PRIMARY_KEY_COLS, keep='first', inplace=True)
         rows_deduplicated_internal = initial_rows_pre_dedupe_df - len(df_merged_weekly)
         print(f"--- RESOLVED: Dropped {rows_deduplicated_internal} duplicate rows from DataFrame. ---")
     else:
         print(
-            f"\n--- PASS: No duplicate primary keys found within the DataFrame ({', '.join(db_primary_key_cols)}). ---")
+            f"\n--- PASS: No duplicate primary keys found within the DataFrame ({', '.join(DB_PRIMARY_KEY_COLS)}). ---")
 
     print(f"\n--- Total records in DataFrame after internal deduplication: {len(df_merged_weekly)} ---")
 
@@ -357,7 +196,11 @@ try:
         print("  No mixed data types found.")
 
     # print("\n--- Data Integrity Checks Complete for PlayerWeeklyStats. Ready for Upload. ---")
+    return df_merged_weekly
 
+
+def load(engine, df_merged_weekly, table_name='PlayerWeeklyStats'):
+    """Filter FK misses and already-loaded keys, append the rest; returns rows uploaded."""
     # Debugging and conditional filtering for FK issues (DimPlayers) (KEEP THIS!)
     print("\n--- Debugging Foreign Key Constraint (player_id) ---")
 
@@ -397,65 +240,63 @@ try:
 
     print(f"\n--- Final records to upload after FK filtering: {len(df_merged_weekly)} ---")
 
-    # --- Pre-upload database duplicate check (Good practice for subsequent runs) ---
-    # This step is still valuable for future runs where the DB might not be empty.
-    print("\n--- Performing pre-upload duplicate check against database ---")
-
-    # Get existing primary keys from the database
-    existing_pks_df = pd.DataFrame(columns=db_primary_key_cols)
-    try:
-        with engine.connect() as connection:
-            # Read only the primary key columns from the existing table
-            existing_pks_df = pd.read_sql_table(
-                'PlayerWeeklyStats',
-                con=connection,
-                columns=db_primary_key_cols
-            )
-        print(f"Found {len(existing_pks_df)} existing records in PlayerWeeklyStats table.")
-    except Exception as e:
-        print(f"Warning: Could not read existing primary keys from DB (likely table is empty or new). Error: {e}")
-        # This block handles the case where the table might not exist yet, or
-        # if there's a permission/connection issue, it won't crash the script.
-
-    # Create a unique identifier for merging/comparing based on the DB's actual PK
-    df_merged_weekly['db_pk_identifier'] = df_merged_weekly[db_primary_key_cols].agg('-'.join, axis=1)
-
-    if not existing_pks_df.empty:
-        # Ensure existing_pks_df columns are also strings for consistent comparison
-        for col in db_primary_key_cols:
-            existing_pks_df[col] = existing_pks_df[col].astype(str)
-        existing_pks_df['db_pk_identifier'] = existing_pks_df[db_primary_key_cols].agg('-'.join, axis=1)
-
-        initial_rows_for_db_check = len(df_merged_weekly)
-        df_to_upload_final = df_merged_weekly[
-            ~df_merged_weekly['db_pk_identifier'].isin(existing_pks_df['db_pk_identifier'])].copy()
-        dropped_db_duplicates_count = initial_rows_for_db_check - len(df_to_upload_final)
-        if dropped_db_duplicates_count > 0:
-            print(
-                f"--- FILTERED: Dropped {dropped_db_duplicates_count} rows because their primary key already exists in the database. ---")
-        else:
-            print("--- Check: No duplicates found between DataFrame and existing database records. ---")
+    # --- Upload only keys the table does not have yet; the anti-join runs in the database ---
+    print("\n--- Uploading new records (primary keys already in the database are skipped) ---")
+    uploaded = insert_new_rows(engine, table_name, df_merged_weekly, DB_PRIMARY_KEY_COLS)
+    skipped = len(df_merged_weekly) - uploaded
+    if skipped > 0:
+        print(f"--- FILTERED: Skipped {skipped} rows because their primary key already exists in the database. ---")
     else:
-        df_to_upload_final = df_merged_weekly.copy()  # No existing records to filter against
-        print("--- Database is empty, no records filtered based on existing DB entries. ---")
+        print("--- Check: No duplicates found between DataFrame and existing database records. ---")
 
-    # Drop the temporary helper column
-    if 'db_pk_identifier' in df_to_upload_final.columns:
-        df_to_upload_final = df_to_upload_final.drop(columns=['db_pk_identifier'])
+    print(f"\n--- Records uploaded to database: {uploaded} ---")
+    return uploaded
 
-    print(f"\n--- Final records to be uploaded to database: {len(df_to_upload_final)} ---")
 
-    # Attempt to upload only the truly new records
-    if not df_to_upload_final.empty:
-        df_to_upload_final.to_sql('PlayerWeeklyStats', con=engine, if_exists='append', index=False, chunksize=1000)
-        print("\nPlayerWeeklyStats data uploaded successfully.")
-    else:
-        print("\nNo new records to upload to PlayerWeeklyStats table.")
+def run(engine):
+    # --- File Path Configuration ---
+    target_file_weekly_offense = data_file('my_player_weekly_stats_offense.csv')
+    target_file_weekly_defense = data_file('my_player_weekly_stats_defense.csv')
 
-except FileNotFoundError as e:
-    print(f"Error: One of the weekly player CSV files not found. Check paths: {e}")
-except Exception as e:
-    print(f"An unexpected error occurred during PlayerWeeklyStats ETL: {e}")
-    raise  # Re-raise the exception after printing for debugging
+    # --- ETL for PlayerWeeklyStats ---
+    print("\nLoading PlayerWeeklyStats...")
+    try:
+        # Under --swap every row is loaded into a shadow table that replaces the live one at the end
+        shadow = ShadowTable(engine, "PlayerWeeklyStats") if shadow_swap() else None
+        if shadow:
+            shadow.create()
+        target_table = shadow.name if shadow else "PlayerWeeklyStats"
+
+        # 1. Read Raw Data from the watermark on (whole files, or key-aligned partitions under ETL_MEMORY_MB)
+        watermark = None if shadow else read_watermark(engine, "PlayerWeeklyStats")
+        print(f"Reading rows from {watermark} on." if watermark else "No watermark; reading every row.")
+        uploaded, latest, weeks = 0, None, set()
+        for df_weekly_off_raw, df_weekly_def_raw in read_paired(
+                target_file_weekly_offense, target_file_weekly_defense, PARTITION_KEYS, READ_OPTIONS,
+                rows_since(watermark)):
+            latest = latest_in(df_weekly_off_raw, df_weekly_def_raw, latest=latest)
+            df_weekly = transform(df_weekly_off_raw, df_weekly_def_raw)
+            loaded = load(engine, df_weekly, target_table)
+            if loaded:
+                # The API re-reads only these weeks of its season cubes
+                df_weeks = df_weekly[['season', 'week']].astype(int).drop_duplicates()
+                weeks.update(df_weeks.itertuples(index=False, name=None))
+            uploaded += loaded
+        if shadow:
+            shadow.swap_in(uploaded)
+        advance_watermark(engine, "PlayerWeeklyStats", latest)
+
+        if uploaded:
+            bump_data_version(engine, "PlayerWeeklyStats", weeks, reloaded=shadow is not None)
+            print(f"\nPlayerWeeklyStats data uploaded successfully ({uploaded} records).")
+        else:
+            print("\nNo new records to upload to PlayerWeeklyStats table.")
+
+    except FileNotFoundError as e:
+        print(f"Error: One of the weekly player CSV files not found. Check paths: {e}")
+        raise
+    except Exception as e:
+        print(f"An unexpected error occurred during PlayerWeeklyStats ETL: {e}")
+        raise  # Re-raise the exception after printing for debugging
 
-print("\nETL process for PlayerWeeklyStats completed.")
\ No newline at end of file
+    print("\nETL process for PlayerWeeklyStats completed.")
@@ -1,65 +1,24 @@
-import os
 import pandas as pd
 import numpy as np
-from sqlalchemy import create_engine, text
-import pymysql
-from dotenv import load_dotenv
-
-# --- Load environment variables from .env file ---
-load_dotenv()
-
-# --- Database Connection Configuration ---
-DB_USER = os.getenv('DB_USER')
-DB_PASSWORD = os.getenv('DB_PASSWORD')
-DB_HOST = os.getenv('DB_HOST')
-DB_PORT = os.getenv('DB_PORT')
-DB_NAME = os.getenv('DB_NAME')
-
-# Ensure all critical variables are loaded
-if not all([DB_USER, DB_PASSWORD, DB_HOST, DB_NAME]):
-    print("Error: One or more database environment variables are not set. Check your .env file.")
-    print("DB_USER:", DB_USER)
-    print("DB_PASSWORD:", DB_PASSWORD)
-    print("DB_HOST:", DB_HOST)
-    print("DB_NAME:", DB_NAME)
-    import sys
-    sys.exit(1)
-
-DATABASE_URL = (
-    f"mysql+pymysql://{DB_USER}:{DB_PASSWORD}@{DB_HOST}:{DB_PORT}/{DB_NAME}?charset=utf8mb4"
-)
-
-try:
-    engine = create_engine(DATABASE_URL)
-    with engine.connect() as connection:
-        result = connection.execute(text("SELECT 1")).scalar()
-        if result == 1:
-            print(f"Successfully connected to MariaDB database '{DB_NAME}'!")
-        else:
-            print("Connection test returned unexpected result.")
-except Exception as e:
-    print(f"Error connecting to the database: {e}")
-    import sys
-    sys.exit(1)
-
-# --- File Path Configuration ---
-cwd = os.getcwd()
-parent_dir = os.path.dirname(cwd)
-sub_directory = "myData"
-# Assuming yearly stats files for teams are named similarly
-file_yearly_offense = 'my_team_yearly_stats_offense.csv'
-file_yearly_defense = 'my_team_yearly_stats_defense.csv'
-
-target_folder = os.path.join(parent_dir, sub_directory)
-target_file_yearly_offense = os.path.join(target_folder, file_yearly_offense)
-target_file_yearly_defense = os.path.join(target_folder, file_yearly_defense)
-
-# --- ETL for TeamYearlyStats ---
-print("\nLoading TeamYearlyStats...")
-try:
-    # 1. Read Raw Data
-    df_yearly_off_raw = pd.read_csv(target_file_yearly_offense)
-    df_yearly_def_raw = pd.read_csv(target_file_yearly_defense)
+
+from backend.models.team_yearly_stats import TeamYearlyStats
+from .config import bump_data_version, data_file
+from .dtypes import cast_to_model, csv_dtypes
+from .reconcile import combine_shared
+from .loading import insert_new_rows
+from .shadow import ShadowTable, shadow_swap
+from .streaming import read_paired
+from .watermarks import advance_watermark, latest_in, read_watermark, rows_since
+
+DB_PRIMARY_KEY_COLS = ['team_id', 'season', 'season_type']
+# Rows sharing these raw columns must be merged together; streaming partitions on them
+PARTITION_KEYS = ['team_id', 'season']
+# Typed reads of only the columns TeamYearlyStats keeps
+READ_OPTIONS = csv_dtypes(TeamYearlyStats)
+
+
+def transform(df_yearly_off_raw, df_yearly_def_raw):
+    """Merge, clean and deduplicate one offense/defense pair; returns df_merged_yearly."""
     print("\nOriginal Offense shape: ", df_yearly_off_raw.shape)
     print("Original Offense Columns:")
     print(df_yearly_off_raw.columns.tolist())
@@ -130,86 +89,28 @@ try:
 
     # --- Consolidate Shared Numeric Stats (summing _x and _y) ---
     print("\n--- Consolidating Shared Stats (Numeric Summing / Non-Numeric Prioritizing) ---")
-    for stat_name in shared_stats_cols:
-        off_col = f"{stat_name}_x"
-        def_col = f"{stat_name}_y"
-
-        if off_col in df_merged_yearly.columns and def_col in df_merged_yearly.columns:
-            if pd.api.types.is_numeric_dtype(df_merged_yearly[off_col]) or pd.api.types.is_numeric_dtype(df_merged_yearly[def_col]):
-                # Sum numeric columns (e.g., win, loss, tie counts if they appear in both and need summing)
-                df_merged_yearly[stat_name] = df_merged_yearly[off_col].fillna(0) + df_merged_yearly[def_col].fillna(0)
-            else:
-                # For non-numeric or if only one is relevant, prioritize _x if available, else _y
-                df_merged_yearly[stat_name] = df_merged_yearly[off_col].fillna(df_merged_yearly[def_col])
-            df_merged_yearly.drop(columns=[off_col, def_col], inplace=True)
-        elif off_col in df_merged_yearly.columns:
-            df_merged_yearly.rename(columns={off_col: stat_name}, inplace=True)
-        elif def_col in df_merged_yearly.columns:
-            df_merged_yearly.rename(columns={def_col: stat_name}, inplace=True)
-
-
-    # --- Define all columns expected to be integer or float in the database ---
-    integer_db_cols = [
-        'season', # PK component
-        'shotgun', 'no_huddle', 'qb_dropback', 'qb_scramble', 'pass_attempts',
-        'complete_pass', 'incomplete_pass', 'rush_attempts', 'tackled_for_loss',
-        'first_down_pass', 'first_down_rush', 'third_down_converted',
-        'third_down_failed', 'fourth_down_converted', 'fourth_down_failed',
-        'rush_touchdown', 'pass_touchdown', 'receiving_touchdown', 'total_off_points',
-        'offense_snaps', 'rush_snaps', 'pass_snaps', 'receptions', 'targets',
-        'touches', 'total_tds',
-        'solo_tackle', 'assist_tackle', 'tackle_with_assist', 'qb_hit',
-        'def_touchdown', 'defensive_two_point_attempt', 'defensive_two_point_conv',
-        'defensive_extra_point_attempt', 'defensive_extra_point_conv',
-        'total_def_points', 'defense_snaps', 'safety', 'interception', 'fumble',
-        'fumble_lost', 'fumble_forced', 'fumble_not_forced', 'fumble_out_of_bounds',
-        'win', 'loss', 'tie'
-    ]
-
-    float_db_cols = [
-        'total_off_yards', 'passing_yards', 'air_yards', 'receiving_yards',
-        'yards_after_catch', 'rushing_yards', 'passing_air_yards',
-        'receiving_air_yards', 'yps', 'adot', 'air_yards_share', 'target_share',
-        'comp_pct', 'int_pct', 'pass_td_pct', 'ypa', 'rec_td_pct', 'yptarget',
-        'ayptarget', 'ypr', 'rush_td_pct', 'ypc', 'td_pct', 'total_yards',
-        'yptouch', 'sack', 'win_pct', 'rush_pct', 'pass_pct'
-    ]
+    df_merged_yearly = combine_shared(df_merged_yearly, shared_stats_cols)
 
-    print("\n--- Casting numeric columns to appropriate types ---")
-    for col in df_merged_yearly.columns:
-        if col in integer_db_cols:
-            try:
-                df_merged_yearly[col] = pd.to_numeric(df_merged_yearly[col], errors='coerce').fillna(0).astype('Int64')
-            except Exception as e:
-                print(f"Error casting '{col}' to Int64. Data type before cast: {df_merged_yearly[col].dtype}")
-                print(f"Sample values (first 5): {df_merged_yearly[col].head().tolist()}")
-                raise e # Re-raise for debugging
-        elif col in float_db_cols:
-            try:
-                df_merged_yearly[col] = pd.to_numeric(df_merged_yearly[col], errors='coerce').fillna(0.0).astype(float)
-            except Exception as e:
-                print(f"Error casting '{col}' to float. Data type before cast: {df_merged_yearly[col].dtype}")
-                print(f"Sample values (first 5): {df_merged_yearly[col].head().tolist()}")
-                raise e # Re-raise for debugging
+    # --- Fill remaining NaN numeric columns with 0 and cast to the TeamYearlyStats column types ---
+    df_merged_yearly = cast_to_model(df_merged_yearly, TeamYearlyStats, keep_missing=merge_keys)
 
 
     # --- IMPORTANT: Define the primary key columns as they are in your MariaDB table ---
     # Your MariaDB's PRIMARY KEY is: (`team_id`,`season`,`season_type`)
-    db_primary_key_cols = ['team_id', 'season', 'season_type']
 
     # Ensure core ID columns have no nulls for PK
     initial_rows_pre_pk_drop = len(df_merged_yearly)
-    df_merged_yearly.dropna(subset=db_primary_key_cols, inplace=True)
+    df_merged_yearly.dropna(subset=DB_PRIMARY_KEY_COLS, inplace=True)
     rows_dropped_pk = initial_rows_pre_pk_drop - len(df_merged_yearly)
     if rows_dropped_pk > 0:
         print(
-            f"\n--- WARNING: Dropped {rows_dropped_pk} rows due to NULLs in database primary key components ({', '.join(db_primary_key_cols)}). ---")
+            f"\n--- WARNING: Dropped {rows_dropped_pk} rows due to NULLs in database primary key components ({', '.join(DB_PRIMARY_KEY_COLS)}). ---")
     else:
         print(f"\n--- Check: No NULLs found in database primary key components. ---")
 
 
     # --- Convert all primary key components to string for consistent comparison ---
-    for col in db_primary_key_cols:
+    for col in DB_PRIMARY_KEY_COLS:
         if col in df_merged_yearly.columns:
             df_merged_yearly[col] = df_merged_yearly[col].astype(str)
         else:
@@ -217,19 +118,19 @@ try:
 
     # --- Deduplicate on the actual database primary key columns *within the DataFrame* ---
     initial_rows_pre_dedupe_df = len(df_merged_yearly)
-    internal_duplicates_df = df_merged_yearly[df_merged_yearly.duplicated(subset=db_primary_key_cols, keep=False)]
+    internal_duplicates_df = df_merged_yearly[df_merged_yearly.duplicated(subset=DB_PRIMARY_KEY_COLS, keep=False)]
 
     if not internal_duplicates_df.empty:
-        print(f"\n--- CRITICAL: Found {len(internal_duplicates_df)} rows with duplicate primary keys within the DataFrame ({', '.join(db_primary_key_cols)})! ---")
+        print(f"\n--- CRITICAL: Found {len(internal_duplicates_df)} rows with duplicate primary keys within the DataFrame ({', '.join(DB_PRIMARY_KEY_COLS)})! ---")
         print("These are the problematic rows (showing first 20):")
-        print(internal_duplicates_df.sort_values(by=db_primary_key_cols).head(20).to_markdown(index=False))
+        print(internal_duplicates_df.sort_values(by=DB_PRIMARY_KEY_COLS).head(20).to_markdown(index=False))
 
         # Drop these duplicates, keeping the first occurrence
-        df_merged_yearly.drop_duplicates(subset=db_primary_key_cols, keep='first', inplace=True)
+        df_merged_yearly.drop_duplicates(subset=DB_PRIMARY_KEY_COLS, keep='first', inplace=True)
         rows_deduplicated_internal = initial_rows_pre_dedupe_df - len(df_merged_yearly)
         print(f"--- RESOLVED: Dropped {rows_deduplicated_internal} duplicate rows from DataFrame. ---")
     else:
-        print(f"\n--- PASS: No duplicate primary keys found within the DataFrame ({', '.join(db_primary_key_cols)}). ---")
+        print(f"\n--- PASS: No duplicate primary keys found within the DataFrame ({', '.join(DB_PRIMARY_KEY_COLS)}). ---")
 
     print(f"\n--- Total records in DataFrame after internal deduplication: {len(df_merged_yearly)} ---")
 
@@ -257,7 +158,11 @@ try:
         print("  No mixed data types found.")
 
     print("\n--- Data Integrity Checks Complete for TeamYearlyStats. Ready for Upload. ---")
+    return df_merged_yearly
+
 
+def load(engine, df_merged_yearly, table_name='TeamYearlyStats'):
+    """Filter FK misses and already-loaded keys, append the rest; returns rows uploaded."""
     # Debugging Foreign Key Constraint (team_id)
     print("\n--- Debugging Foreign Key Constraint (team_id) ---")
 
@@ -297,60 +202,57 @@ try:
     print(f"\n--- Final records to upload after all FK filtering: {len(df_merged_yearly)} ---")
 
 
-    # --- Pre-upload database duplicate check (Good practice for subsequent runs) ---
-    print("\n--- Performing pre-upload duplicate check against database ---")
-
-    # Get existing primary keys from the database
-    existing_pks_df = pd.DataFrame(columns=db_primary_key_cols)
-    try:
-        with engine.connect() as connection:
-            # Read only the primary key columns from the existing table
-            existing_pks_df = pd.read_sql_table(
-                'TeamYearlyStats', # Target table name
-                con=connection,
-                columns=db_primary_key_cols
-            )
-        print(f"Found {len(existing_pks_df)} existing records in TeamYearlyStats table.")
-    except Exception as e:
-        print(f"Warning: Could not read existing primary keys from DB (likely table is empty or new). Error: {e}")
-
-    # Create a unique identifier for merging/comparing based on the DB's actual PK
-    df_merged_yearly['db_pk_identifier'] = df_merged_yearly[db_primary_key_cols].agg('-'.join, axis=1)
-
-    if not existing_pks_df.empty:
-        # Ensure existing_pks_df columns are also strings for consistent comparison
-        for col in db_primary_key_cols:
-            existing_pks_df[col] = existing_pks_df[col].astype(str)
-        existing_pks_df['db_pk_identifier'] = existing_pks_df[db_primary_key_cols].agg('-'.join, axis=1)
-
-        initial_rows_for_db_check = len(df_merged_yearly)
-        df_to_upload_final = df_merged_yearly[~df_merged_yearly['db_pk_identifier'].isin(existing_pks_df['db_pk_identifier'])].copy()
-        dropped_db_duplicates_count = initial_rows_for_db_check - len(df_to_upload_final)
-        if dropped_db_duplicates_count > 0:
-            print(f"--- FILTERED: Dropped {dropped_db_duplicates_count} rows because their primary key already exists in the database. ---")
-        else:
-            print("--- Check: No duplicates found between DataFrame and existing database records. ---")
+    # --- Upload only keys the table does not have yet; the anti-join runs in the database ---
+    print("\n--- Uploading new records (primary keys already in the database are skipped) ---")
+    uploaded = insert_new_rows(engine, table_name, df_merged_yearly, DB_PRIMARY_KEY_COLS)
+    skipped = len(df_merged_yearly) - uploaded
+    if skipped > 0:
+        print(f"--- FILTERED: Skipped {skipped} rows because their primary key already exists in the database. ---")
     else:
-        df_to_upload_final = df_merged_yearly.copy() # No existing records to filter against
-        print("--- Database is empty, no records filtered based on existing DB entries. ---")
+        print("--- Check: No duplicates found between DataFrame and existing database records. ---")
 
-    # Drop the temporary helper column
-    if 'db_pk_identifier' in df_to_upload_final.columns:
-        df_to_upload_final = df_to_upload_final.drop(columns=['db_pk_identifier'])
+    print(f"\n--- Records uploaded to database: {uploaded} ---")
+    return uploaded
 
-    print(f"\n--- Final records to be uploaded to database: {len(df_to_upload_final)} ---")
 
-    # Attempt to upload only the truly new records
-    if not df_to_upload_final.empty:
-        df_to_upload_final.to_sql('TeamYearlyStats', con=engine, if_exists='append', index=False, chunksize=1000) # Target table name
-        print("\nTeamYearlyStats data uploaded successfully.")
-    else:
-        print("\nNo new records to upload to TeamYearlyStats table.")
+def run(engine):
+    # --- File Path Configuration ---
+    target_file_yearly_offense = data_file('my_team_yearly_stats_offense.csv')
+    target_file_yearly_defense = data_file('my_team_yearly_stats_defense.csv')
+
+    # --- ETL for TeamYearlyStats ---
+    print("\nLoading TeamYearlyStats...")
+    try:
+        # Under --swap every row is loaded into a shadow table that replaces the live one at the end
+        shadow = ShadowTable(engine, "TeamYearlyStats") if shadow_swap() else None
+        if shadow:
+            shadow.create()
+        target_table = shadow.name if shadow else "TeamYearlyStats"
+
+        # 1. Read Raw Data from the watermark on (whole files, or key-aligned partitions under ETL_MEMORY_MB)
+        watermark = None if shadow else read_watermark(engine, "TeamYearlyStats")
+        print(f"Reading rows from {watermark} on." if watermark else "No watermark; reading every row.")
+        uploaded, latest = 0, None
+        for df_yearly_off_raw, df_yearly_def_raw in read_paired(
+                target_file_yearly_offense, target_file_yearly_defense, PARTITION_KEYS, READ_OPTIONS,
+                rows_since(watermark)):
+            latest = latest_in(df_yearly_off_raw, df_yearly_def_raw, has_week=False, latest=latest)
+            uploaded += load(engine, transform(df_yearly_off_raw, df_yearly_def_raw), target_table)
+        if shadow:
+            shadow.swap_in(uploaded)
+        advance_watermark(engine, "TeamYearlyStats", latest)
+
+        if uploaded:
+            bump_data_version(engine, "TeamYearlyStats")
+            print(f"\nTeamYearlyStats data uploaded successfully ({uploaded} records).")
+        else:
+            print("\nNo new records to upload to TeamYearlyStats table.")
 
-except FileNotFoundError as e:
-    print(f"Error: One of the yearly team CSV files not found. Check paths: {e}")
-except Exception as e:
-    print(f"An unexpected error occurred during TeamYearlyStats ETL: {e}")
-    raise # Re-raise the exception after printing for debugging
+    except FileNotFoundError as e:
+        print(f"Error: One of the yearly team CSV files not found. Check paths: {e}")
+        raise
+    except Exception as e:
+        print(f"An unexpected error occurred during TeamYearlyStats ETL: {e}")
+        raise # Re-raise the exception after printing for debugging
 
-print("\nETL process for TeamYearlyStats completed.")
\ No newline at end of file
+    print("\nETL process for TeamYearlyStats completed.")
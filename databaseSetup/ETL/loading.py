@@ -0,0 +1,220 @@
+"""Bulk-append cleaned frames, deduplicated against the target table inside the database.
+
+Rows reach the database through LOAD DATA LOCAL INFILE from a temporary TSV on
+MySQL/MariaDB, or through batched multi-row INSERTs (executemany) on other backends, when
+ETL_LOCAL_INFILE=0, or once the server has refused a local infile.
+
+A frame can be split by season (or a hash of its key) and loaded over ETL_LOAD_WORKERS
+connections at once, each partition in its own transaction and retried up to
+ETL_LOAD_RETRIES times on deadlocks and dropped connections. With ETL_ATOMIC_PUBLISH=1 the
+partitions are only staged in parallel and reach the target in one final transaction.
+"""
+import os
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import DBAPIError
+
+from .config import LOCAL_INFILE
+
+# Server/client error codes for "LOAD DATA LOCAL is disabled"
+LOCAL_INFILE_REJECTED = {1148, 2068, 3948}
+# Lock wait timeout, deadlock, server gone away, lost connection: a partition can rerun
+RETRYABLE_ERRORS = {1205, 1213, 2006, 2013}
+EXECUTEMANY_BATCH_ROWS = 5000
+
+_local_infile_refused = False
+
+
+def load_workers():
+    """Partitions of one frame loaded at once (ETL_LOAD_WORKERS, default 1)."""
+    return max(int(os.getenv('ETL_LOAD_WORKERS', '1')), 1)
+
+
+def load_retries():
+    return max(int(os.getenv('ETL_LOAD_RETRIES', '2')), 0)
+
+
+def atomic_publish():
+    return os.getenv('ETL_ATOMIC_PUBLISH', '0') == '1'
+
+
+def _to_tsv(df, path):
+    # Unquoted NULL is read as NULL because the fields are optionally enclosed; strings
+    # holding tabs, quotes or newlines are quoted by to_csv and need no escaping
+    df.to_csv(path, sep='\t', header=False, index=False, na_rep='NULL', lineterminator='\n')
+
+
+def load_data_local_infile(connection, table_name, df):
+    """Append `df` to `table_name` with LOAD DATA LOCAL INFILE; returns rows loaded."""
+    quote = connection.dialect.identifier_preparer.quote
+    fd, path = tempfile.mkstemp(prefix=f'{table_name}_', suffix='.tsv')
+    os.close(fd)
+    try:
+        _to_tsv(df, path)
+        result = connection.execute(text(
+            f"LOAD DATA LOCAL INFILE :path INTO TABLE {quote(table_name)} CHARACTER SET utf8mb4 "
+            "FIELDS TERMINATED BY '\\t' OPTIONALLY ENCLOSED BY '\"' ESCAPED BY '' "
+            "LINES TERMINATED BY '\\n' "
+            f"({', '.join(quote(col) for col in df.columns)})"
+        ), {'path': path})
+    finally:
+        os.remove(path)
+    return result.rowcount
+
+
+def insert_executemany(connection, table_name, df, batch_rows=EXECUTEMANY_BATCH_ROWS):
+    """Append `df` to `table_name` with batched executemany; returns rows inserted.
+
+    pymysql folds each batch into multi-row INSERT statements.
+    """
+    quote = connection.dialect.identifier_preparer.quote
+    params = [f'p{i}' for i in range(len(df.columns))]
+    statement = text(
+        f"INSERT INTO {quote(table_name)} ({', '.join(quote(col) for col in df.columns)}) "
+        f"VALUES ({', '.join(f':{param}' for param in params)})"
+    )
+    # DB-API drivers take Python floats and None, not float32 scalars and pandas NA
+    frame = df.astype({col: 'float64' for col in df.columns if df[col].dtype == 'float32'})
+    frame = frame.astype(object).where(frame.notna(), None)
+    frame.columns = params
+    for start in range(0, len(frame), batch_rows):
+        connection.execute(statement, frame.iloc[start:start + batch_rows].to_dict('records'))
+    return len(frame)
+
+
+def _error_code(error):
+    return error.orig.args[0] if error.orig is not None and error.orig.args else None
+
+
+def bulk_insert(connection, table_name, df):
+    """Append `df` to the existing `table_name` by the fastest path the server allows."""
+    global _local_infile_refused
+    if LOCAL_INFILE and not _local_infile_refused and connection.dialect.name == 'mysql':
+        try:
+            return load_data_local_infile(connection, table_name, df)
+        except DBAPIError as e:
+            if _error_code(e) not in LOCAL_INFILE_REJECTED:
+                raise
+            _local_infile_refused = True
+            print(f"LOAD DATA LOCAL INFILE refused ({_error_code(e)}); loading with batched INSERTs instead.")
+    return insert_executemany(connection, table_name, df)
+
+
+def _partitions(df, key_cols, count):
+    """Split `df` into key-disjoint parts: one per season when the key has one, else by key hash."""
+    if count == 1:
+        return [df]
+    if 'season' in key_cols:
+        return [part for _, part in df.groupby('season', sort=False)]
+    buckets = pd.util.hash_pandas_object(df[key_cols], index=False).to_numpy() % count
+    return [part for _, part in df.groupby(buckets)]
+
+
+def _with_retries(func, *args):
+    retries = load_retries()
+    for attempt in range(retries + 1):
+        try:
+            return func(*args)
+        except DBAPIError as e:
+            if _error_code(e) not in RETRYABLE_ERRORS or attempt == retries:
+                raise
+            print(f"Partition load failed ({_error_code(e)}); retry {attempt + 1} of {retries}")
+            time.sleep(2 ** attempt)
+
+
+def _create_staging(connection, table_name, staging_name, df, temporary=False):
+    """Create an empty staging table with the target's column types and key.
+
+    The transform casts key columns to str, so a table inferred from `df` would stage them
+    as TEXT and the anti-join could no longer use the target's primary key. A TEMPORARY
+    table belongs to its connection and, unlike CREATE/DROP TABLE, does not commit the
+    open transaction.
+    """
+    if connection.dialect.name != 'mysql':
+        df.head(0).to_sql(staging_name, con=connection, if_exists='replace', index=False)
+        return
+    quote = connection.dialect.identifier_preparer.quote
+    _drop_staging(connection, staging_name, temporary)
+    connection.execute(text(
+        f"CREATE {'TEMPORARY ' if temporary else ''}TABLE {quote(staging_name)} LIKE {quote(table_name)}"
+    ))
+
+
+def _drop_staging(connection, staging_name, temporary=False):
+    quote = connection.dialect.identifier_preparer.quote
+    temporary = temporary and connection.dialect.name == 'mysql'
+    connection.execute(text(f"DROP {'TEMPORARY ' if temporary else ''}TABLE IF EXISTS {quote(staging_name)}"))
+
+
+def _publish(connection, table_name, staging_name, columns, key_cols):
+    """Copy the staged rows whose key the target lacks; returns rows inserted."""
+    quote = connection.dialect.identifier_preparer.quote
+    column_list = ', '.join(quote(col) for col in columns)
+    matches = ' AND '.join(f'existing.{quote(col)} = staged.{quote(col)}' for col in key_cols)
+    result = connection.execute(text(
+        f"INSERT INTO {quote(table_name)} ({column_list}) "
+        f"SELECT {column_list} FROM {quote(staging_name)} AS staged "
+        f"WHERE NOT EXISTS (SELECT 1 FROM {quote(table_name)} AS existing WHERE {matches})"
+    ))
+    return result.rowcount
+
+
+def _load_partition(engine, table_name, df, key_cols, staging_name):
+    """Stage and publish one partition in its own transaction; returns rows inserted."""
+    with engine.begin() as connection:
+        _create_staging(connection, table_name, staging_name, df, temporary=True)
+        try:
+            bulk_insert(connection, staging_name, df)
+            return _publish(connection, table_name, staging_name, df.columns, key_cols)
+        finally:
+            _drop_staging(connection, staging_name, temporary=True)
+
+
+def _stage_partition(engine, staging_name, df):
+    with engine.begin() as connection:
+        bulk_insert(connection, staging_name, df)
+
+
+def insert_new_rows(engine, table_name, df, key_cols):
+    """Insert the rows of `df` whose `key_cols` are not in `table_name` yet; returns how many.
+
+    Rows are bulk-loaded into a scratch staging table and copied over with one
+    INSERT ... SELECT ... WHERE NOT EXISTS on the key, which the target's primary key index
+    answers per staged row, so dedup cost follows the batch size, not the table size. The
+    anti-join also makes a partition safe to retry. Without atomic publish, a failure can
+    leave earlier partitions loaded; rerunning the stage fills in the rest.
+    """
+    if df.empty:
+        return 0
+    with engine.begin() as connection:
+        if not inspect(connection).has_table(table_name):
+            # First load: let pandas create the table as the plain append used to
+            df.head(0).to_sql(table_name, con=connection, index=False)
+
+    workers = load_workers()
+    parts = _partitions(df, key_cols, workers)
+    # Per process, so stages loading in parallel never share one
+    staging_name = f'{table_name}_staging_{os.getpid()}'
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        if not atomic_publish():
+            futures = [
+                pool.submit(_with_retries, _load_partition, engine, table_name, part, key_cols, f'{staging_name}_{i}')
+                for i, part in enumerate(parts)
+            ]
+            return sum(future.result() for future in futures)
+
+        # Staged over several connections, so this staging table cannot be TEMPORARY
+        with engine.begin() as connection:
+            _create_staging(connection, table_name, staging_name, df)
+        try:
+            for future in [pool.submit(_with_retries, _stage_partition, engine, staging_name, part) for part in parts]:
+                future.result()
+            with engine.begin() as connection:
+                return _publish(connection, table_name, staging_name, df.columns, key_cols)
+        finally:
+            with engine.begin() as connection:
+                _drop_staging(connection, staging_name)
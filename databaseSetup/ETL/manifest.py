@@ -0,0 +1,127 @@
+"""Make-style manifest of the ETL inputs, so unchanged stages are skipped.
+
+For every CSV a stage reads it records the size, mtime, a content hash and the header
+line, and for every stage the fingerprint of the table it loaded (row count and data
+version) along with the fingerprints of the stages it depends on. A stage is up to date
+when its files hash the same, the tables it depends on have not changed since it last ran
+and its own table still looks the way it left it. The pipeline skips up-to-date stages.
+Since it compares upstream tables, only the stages downstream of a changed file rerun.
+
+A file whose size and mtime match its entry keeps its recorded hash without being read.
+The manifest is a JSON file, ETL_MANIFEST, by default .etl_manifest.json in the data
+directory.
+"""
+import hashlib
+import json
+import os
+
+from sqlalchemy import inspect, text
+
+from .config import DATA_DIR, data_file
+
+HASH_BLOCK_BYTES = 1 << 20
+
+
+def manifest_path():
+    return os.getenv('ETL_MANIFEST', os.path.join(DATA_DIR, '.etl_manifest.json'))
+
+
+def read_manifest(path=None):
+    path = path or manifest_path()
+    if not os.path.exists(path):
+        return {'files': {}, 'stages': {}}
+    with open(path) as f:
+        return json.load(f)
+
+
+def write_manifest(manifest, path=None):
+    """Replace the manifest file in one rename, so a crash never leaves half of one."""
+    path = path or manifest_path()
+    with open(f'{path}.tmp', 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(f'{path}.tmp', path)
+
+
+def hash_file(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, 'rb') as f:
+        while block := f.read(HASH_BLOCK_BYTES):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def file_entry(name, previous=None):
+    """Size, mtime, hash and header of a data file; reuses `previous`'s hash if it looks untouched."""
+    path = data_file(name)
+    if not os.path.exists(path):
+        return None
+    stat = os.stat(path)
+    if previous and previous['size'] == stat.st_size and previous['mtime_ns'] == stat.st_mtime_ns:
+        return previous
+    with open(path, newline='') as f:
+        header = f.readline().rstrip('\r\n')
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'hash': hash_file(path), 'header': header}
+
+
+def output_fingerprint(engine, table_name):
+    """Row count and data version of a stage's table, or None if it does not exist."""
+    with engine.connect() as connection:
+        tables = inspect(connection)
+        if not tables.has_table(table_name):
+            return None
+        quote = connection.dialect.identifier_preparer.quote
+        rows = connection.execute(text(f"SELECT COUNT(*) FROM {quote(table_name)}")).scalar()
+        version = None
+        if tables.has_table('DataVersions'):
+            version = connection.execute(text(
+                "SELECT version FROM DataVersions WHERE table_name = :table_name"
+            ), {"table_name": table_name}).scalar()
+    return {'rows': rows, 'version': version}
+
+
+class Manifest:
+    """The manifest of one pipeline run, checked and updated as stages finish."""
+
+    def __init__(self, engine, path=None):
+        self.engine = engine
+        self.path = path or manifest_path()
+        self.data = read_manifest(self.path)
+        self.files = {}
+
+    def file(self, name):
+        # Each file is looked at once per run, before any stage records it
+        if name not in self.files:
+            self.files[name] = file_entry(name, self.data['files'].get(name))
+        return self.files[name]
+
+    def stale_reason(self, stage):
+        """Why `stage` has to run, or None when it is up to date."""
+        record = self.data['stages'].get(stage.name)
+        if record is None:
+            return "never loaded"
+        for name in stage.inputs:
+            current, recorded = self.file(name), self.data['files'].get(name)
+            if current is None:
+                return f"{name} is missing"
+            if current['hash'] != record['inputs'].get(name):
+                if recorded and current['header'] != recorded['header']:
+                    return f"{name} columns changed"
+                return f"{name} changed"
+        for dep in stage.depends_on:
+            if output_fingerprint(self.engine, dep) != record['upstream'].get(dep):
+                return f"{dep} changed"
+        if output_fingerprint(self.engine, stage.name) != record['output']:
+            return f"{stage.name} table changed outside the ETL"
+        return None
+
+    def record(self, stage, inputs):
+        """Note that `stage` loaded `inputs` (file entries taken before it ran) and save."""
+        for name, entry in inputs.items():
+            if entry is not None:
+                self.data['files'][name] = entry
+        self.data['stages'][stage.name] = {
+            'inputs': {name: entry and entry['hash'] for name, entry in inputs.items()},
+            'upstream': {dep: output_fingerprint(self.engine, dep) for dep in stage.depends_on},
+            'output': output_fingerprint(self.engine, stage.name),
+        }
+        write_manifest(self.data, self.path)
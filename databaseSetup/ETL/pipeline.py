@@ -0,0 +1,220 @@
+"""Stage DAG for the ETL loads, run with independent stages in parallel processes.
+
+    python -m databaseSetup.ETL                          # everything
+    python -m databaseSetup.ETL --only PlayerWeeklyStats
+    python -m databaseSetup.ETL --from DimPlayers        # DimPlayers and everything after it
+
+A stage starts once the stages it depends on have finished; dependencies left out of the
+selection are assumed to be loaded already. Each stage runs in its own worker process with
+its own engine. Stages whose input files and upstream tables are unchanged since they last
+loaded are skipped (see manifest.py); --full runs them anyway. --swap reloads the fact
+tables into shadow copies that replace the live tables atomically (see shadow.py).
+When PlayerWeeklyStats loads and STAT_SNAPSHOT_DIR (or --snapshot-dir) is set, a new stat
+snapshot is published for the API workers to swap to.
+"""
+import argparse
+import importlib
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import NullPool
+
+from backend.services import stat_snapshot
+
+from .config import check_connection, check_settings, get_engine
+from .manifest import Manifest
+
+
+class Stage:
+    def __init__(self, name, module, depends_on=(), inputs=()):
+        self.name = name
+        self.module = module
+        self.depends_on = tuple(depends_on)
+        # CSVs in the data directory the stage reads
+        self.inputs = tuple(inputs)
+
+
+STAGES = {
+    stage.name: stage
+    for stage in [
+        Stage("DimTeams", "etl_DimTeams", inputs=["my_player_weekly_stats_offense.csv"]),
+        Stage("DimPlayers", "etl_DimPlayers", ["DimTeams"],
+              ["my_player_weekly_stats_offense.csv", "my_player_weekly_stats_defense.csv"]),
+        Stage("PlayerWeeklyStats", "etl_PlayerWeeklyStats", ["DimPlayers"],
+              ["my_player_weekly_stats_offense.csv", "my_player_weekly_stats_defense.csv"]),
+        Stage("PlayerYearlyStats", "etl_PlayerYearlyStats", ["DimPlayers"],
+              ["my_player_yearly_stats_offense.csv", "my_player_yearly_stats_defense.csv"]),
+        Stage("TeamWeeklyStats", "etl_TeamWeeklyStats", ["DimPlayers"],
+              ["my_team_weekly_stats_offense.csv", "my_team_weekly_stats_defense.csv"]),
+        Stage("TeamYearlyStats", "etl_TeamYearlyStats", ["DimPlayers"],
+              ["my_team_yearly_stats_offense.csv", "my_team_yearly_stats_defense.csv"]),
+        Stage("DefenseVsPosition", "etl_DefenseVsPosition", ["PlayerWeeklyStats", "TeamWeeklyStats"]),
+    ]
+}
+
+
+def downstream_of(name):
+    """`name` and every stage that depends on it, directly or not."""
+    selected = {name}
+    changed = True
+    while changed:
+        changed = False
+        for stage in STAGES.values():
+            if stage.name not in selected and selected.intersection(stage.depends_on):
+                selected.add(stage.name)
+                changed = True
+    return selected
+
+
+def run_stage(name):
+    """Worker entry point: load one stage with a fresh engine and return its wall time."""
+    module = importlib.import_module(f"{__package__}.{STAGES[name].module}")
+    engine = get_engine()
+    started = time.perf_counter()
+    try:
+        module.run(engine)
+    finally:
+        engine.dispose()
+    return time.perf_counter() - started
+
+
+def run_pipeline(selected, workers, manifest=None, force=False):
+    """Run the selected stages in dependency order; returns ({stage: seconds}, {stage: error}, skipped).
+
+    With a manifest, stages it finds up to date are skipped (unless `force`) and the ones that
+    run are recorded in it.
+    """
+    pending = [name for name in STAGES if name in selected]
+    finished, timings, failures, skipped = set(), {}, {}, set()
+    inputs = {}
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        running = {}
+        while pending or running:
+            for name in list(pending):
+                depends_on = [dep for dep in STAGES[name].depends_on if dep in selected]
+                if any(dep in failures for dep in depends_on):
+                    failures[name] = "skipped: a stage it depends on failed"
+                    pending.remove(name)
+                elif all(dep in finished for dep in depends_on):
+                    pending.remove(name)
+                    if manifest is None:
+                        reason = "selected"
+                    else:
+                        reason = "forced" if force else manifest.stale_reason(STAGES[name])
+                    if reason is None:
+                        print(f"\n=== Skipping {name}: inputs unchanged ===")
+                        skipped.add(name)
+                        finished.add(name)
+                        continue
+                    if manifest is not None:
+                        # Taken before the stage reads them, so an edit made mid-run is seen next time
+                        inputs[name] = {file: manifest.file(file) for file in STAGES[name].inputs}
+                    print(f"\n=== Starting {name} ({reason}) ===")
+                    running[pool.submit(run_stage, name)] = name
+            if not running:
+                continue
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    timings[name] = future.result()
+                    finished.add(name)
+                    print(f"=== Finished {name} in {timings[name]:.1f}s ===")
+                    if manifest is not None:
+                        manifest.record(STAGES[name], inputs[name])
+                except Exception as e:
+                    failures[name] = f"{type(e).__name__}: {e}"
+                    print(f"=== {name} failed: {failures[name]} ===")
+    return timings, failures, skipped
+
+
+def publish_snapshot(root):
+    """Publish the reloaded weekly stats as a new snapshot version for the API workers."""
+    engine = get_engine()
+    try:
+        with Session(engine) as db:
+            version = stat_snapshot.publish_from_db(db, root)
+        print(f"Published stat snapshot v{version} to {root}")
+    finally:
+        engine.dispose()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load the NFL stats database.")
+    selection = parser.add_mutually_exclusive_group()
+    selection.add_argument("--only", nargs="+", choices=list(STAGES), metavar="STAGE",
+                           help="run just these stages")
+    selection.add_argument("--from", dest="start", choices=list(STAGES), metavar="STAGE",
+                           help="run this stage and every stage after it")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                        help="stages run at the same time (default: CPU count)")
+    parser.add_argument("--memory-mb", type=float,
+                        help="stream each stage's CSVs in partitions sized to this budget (default: whole files)")
+    parser.add_argument("--load-workers", type=int,
+                        help="connections loading partitions of one stage's rows at once (default: 1)")
+    parser.add_argument("--atomic-publish", action="store_true",
+                        help="stage partitions in parallel but publish each batch in one transaction")
+    parser.add_argument("--full", action="store_true",
+                        help="run every selected stage, even unchanged ones, and re-read every row of "
+                             "the exports instead of starting from the per-table watermarks")
+    parser.add_argument("--swap", action="store_true",
+                        help="reload every row of the fact tables into shadow tables and swap them in "
+                             "with RENAME TABLE, so readers never see a half-loaded table")
+    parser.add_argument("--snapshot-dir", default=stat_snapshot.snapshot_root(),
+                        help="publish a stat snapshot here after PlayerWeeklyStats loads "
+                             f"(default ${stat_snapshot.SNAPSHOT_ENV})")
+    parser.add_argument("--list", action="store_true", help="show the stages and exit")
+    args = parser.parse_args()
+
+    if args.list:
+        for stage in STAGES.values():
+            print(f"{stage.name:<20} after: {', '.join(stage.depends_on) or '-'}")
+        return
+
+    if args.only:
+        selected = set(args.only)
+    elif args.start:
+        selected = downstream_of(args.start)
+    else:
+        selected = set(STAGES)
+
+    # Read by each stage worker, which inherits this environment
+    if args.memory_mb:
+        os.environ["ETL_MEMORY_MB"] = str(args.memory_mb)
+    if args.load_workers:
+        os.environ["ETL_LOAD_WORKERS"] = str(args.load_workers)
+    if args.atomic_publish:
+        os.environ["ETL_ATOMIC_PUBLISH"] = "1"
+    if args.full:
+        os.environ["ETL_FULL_RELOAD"] = "1"
+    if args.swap:
+        os.environ["ETL_SHADOW_SWAP"] = "1"
+
+    check_settings()
+    engine = get_engine()
+    check_connection(engine)
+    engine.dispose()
+    # Unpooled, so no open connection is inherited by the stage worker processes
+    manifest = Manifest(get_engine(poolclass=NullPool))
+
+    started = time.perf_counter()
+    timings, failures, skipped = run_pipeline(selected, max(args.workers, 1), manifest, args.full or args.swap)
+    elapsed = time.perf_counter() - started
+
+    print(f"\n{'=' * 60}")
+    print(f"{'Stage':<20} {'Wall time':>10}")
+    for name in STAGES:
+        if name in timings:
+            print(f"{name:<20} {timings[name]:>9.1f}s")
+        elif name in skipped:
+            print(f"{name:<20} {'unchanged':>10}")
+        elif name in failures:
+            print(f"{name:<20} {'FAILED':>10}  {failures[name]}")
+    print(f"{'Total':<20} {elapsed:>9.1f}s  (sum of stages {sum(timings.values()):.1f}s)")
+    print(f"{'=' * 60}")
+    if args.snapshot_dir and "PlayerWeeklyStats" in timings:
+        publish_snapshot(args.snapshot_dir)
+    if failures:
+        raise SystemExit(1)
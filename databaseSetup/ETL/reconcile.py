@@ -0,0 +1,79 @@
+"""Vectorized reconciliation of the offense/defense outer merge.
+
+Columns both files carry come back from the merge as `<name>_x` (offense) and `<name>_y`
+(defense). These helpers fold them back into one column per name for the whole frame at
+once, rather than a row-wise apply and a fillna/drop per column.
+"""
+import numpy as np
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+# Normalized raw labels mapped to the labels the tables store; regular wins over postseason
+SEASON_TYPE_LABELS = {'regular': 'Reg', 'postseason': 'Post'}
+
+
+def _normalized(df, column):
+    """(distinct labels, per-row index into them) for a column that may be absent.
+
+    Labels are stripped and lower-cased, with '' last for missing values. The string work
+    runs once per distinct value on the categories; rows only carry integer codes.
+    """
+    if column not in df.columns:
+        return np.array([''], dtype=object), np.full(len(df), -1)
+    values = df[column].astype('category')
+    labels = values.cat.categories.astype(str).str.strip().str.lower()
+    # Missing rows have code -1, which picks the trailing ''
+    return np.append(labels.to_numpy(dtype=object), ''), values.cat.codes.to_numpy()
+
+
+def resolve_season_type(df, column='season_type'):
+    """Replace `<column>_x`/`<column>_y` with one `column`.
+
+    'Reg' if either side is regular season, else 'Post' if either is postseason, else
+    whichever side has a value (capitalized), else 'Unknown'.
+    """
+    off_col, def_col = f'{column}_x', f'{column}_y'
+    off_labels, off_codes = _normalized(df, off_col)
+    def_labels, def_codes = _normalized(df, def_col)
+    off_type, def_type = off_labels[off_codes], def_labels[def_codes]
+    capitalize = np.vectorize(str.capitalize, otypes=[object])
+
+    conditions = [(off_type == label) | (def_type == label) for label in SEASON_TYPE_LABELS]
+    choices = list(SEASON_TYPE_LABELS.values())
+    conditions += [off_type != '', def_type != '']
+    choices += [capitalize(off_labels)[off_codes], capitalize(def_labels)[def_codes]]
+
+    resolved = np.select(conditions, choices, default='Unknown')
+    df = df.drop(columns=[col for col in (off_col, def_col) if col in df.columns])
+    df[column] = resolved
+    return df
+
+
+def combine_shared(df, names):
+    """Fold each `<name>_x`/`<name>_y` pair in `names` into `<name>`.
+
+    Numeric pairs are added in one block (missing counts as 0); other pairs take the
+    offense value and fall back to defense. Names only one side had lose their suffix.
+    """
+    both = [name for name in names if f'{name}_x' in df.columns and f'{name}_y' in df.columns]
+    numeric = [
+        name for name in both
+        if is_numeric_dtype(df[f'{name}_x']) or is_numeric_dtype(df[f'{name}_y'])
+    ]
+    other = [name for name in both if name not in numeric]
+    off = df[[f'{name}_x' for name in both]].set_axis(both, axis=1)
+    defense = df[[f'{name}_y' for name in both]].set_axis(both, axis=1)
+    combined = pd.concat(
+        [off[numeric].fillna(0).add(defense[numeric].fillna(0)), off[other].fillna(defense[other])],
+        axis=1,
+    )
+
+    renames = {}
+    for name in names:
+        if name in both:
+            continue
+        for suffixed in (f'{name}_x', f'{name}_y'):
+            if suffixed in df.columns:
+                renames[suffixed] = name
+    paired = [f'{name}{suffix}' for name in both for suffix in ('_x', '_y')]
+    return pd.concat([df.drop(columns=paired).rename(columns=renames), combined], axis=1)
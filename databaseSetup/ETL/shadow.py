@@ -0,0 +1,132 @@
+"""Zero-downtime reloads of the fact tables: build a shadow copy, then swap it in.
+
+With ETL_SHADOW_SWAP=1 (--swap) a stage loads every row into `<table>_shadow` instead of
+appending to the live table the API is reading. The shadow starts as a copy of the live
+table's definition without its secondary indexes and foreign keys, so the bulk load only
+maintains the primary key. Once loaded, the indexes are built in one ALTER TABLE, the foreign
+keys are added back, the row count is checked, and one RENAME TABLE swaps the shadow in.
+Readers see the old table up to the rename and the complete new one after it.
+
+A shadow holding fewer rows than the live table is not swapped in unless
+ETL_SWAP_ALLOW_SHRINK=1, since a short reload usually means a truncated export. A failed
+reload leaves the live table as it was; the next one drops the leftover shadow.
+MySQL/MariaDB only.
+"""
+import os
+
+from sqlalchemy import inspect, text
+
+
+def shadow_swap():
+    return os.getenv('ETL_SHADOW_SWAP', '0') == '1'
+
+
+def allow_shrink():
+    return os.getenv('ETL_SWAP_ALLOW_SHRINK', '0') == '1'
+
+
+class ShadowTable:
+    def __init__(self, engine, table_name):
+        self.engine = engine
+        self.table_name = table_name
+        self.name = f'{table_name}_shadow'
+        self.retired_name = f'{table_name}_retired'
+        # Taken off the shadow for the load and added back before the swap
+        self.indexes = []
+        self.foreign_keys = []
+
+    def _quote(self, name):
+        return self.engine.dialect.identifier_preparer.quote(name)
+
+    def _columns(self, names):
+        return ', '.join(self._quote(name) for name in names)
+
+    def _count(self, connection, table_name):
+        return connection.execute(text(f"SELECT COUNT(*) FROM {self._quote(table_name)}")).scalar()
+
+    def create(self):
+        """(Re)create an empty shadow shaped like the live table, minus secondary indexes and foreign keys.
+
+        With no live table yet there is nothing to copy: the first load creates the shadow
+        from the frame, as it would the table itself.
+        """
+        if self.engine.dialect.name != 'mysql':
+            raise ValueError(f"Shadow swaps need MySQL/MariaDB, not {self.engine.dialect.name}.")
+        shadow = self._quote(self.name)
+        with self.engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {shadow}"))
+            if not inspect(connection).has_table(self.table_name):
+                return
+            # LIKE copies columns, primary key and indexes, but no foreign keys
+            connection.execute(text(f"CREATE TABLE {shadow} LIKE {self._quote(self.table_name)}"))
+            tables = inspect(connection)
+            # FULLTEXT/SPATIAL and prefix indexes carry dialect options; they stay on the shadow
+            self.indexes = [index for index in tables.get_indexes(self.name) if not index.get('dialect_options')]
+            self.foreign_keys = tables.get_foreign_keys(self.table_name)
+            if self.indexes:
+                connection.execute(text(f"ALTER TABLE {shadow} " + ', '.join(
+                    f"DROP INDEX {self._quote(index['name'])}" for index in self.indexes
+                )))
+        print(f"Loading into {self.name} with {len(self.indexes)} index(es) and "
+              f"{len(self.foreign_keys)} foreign key(s) deferred.")
+
+    @staticmethod
+    def _actions(key):
+        """The key's ON DELETE / ON UPDATE clauses, so the swap keeps its referential behaviour."""
+        options = key.get('options') or {}
+        return ''.join(
+            f" ON {action.upper()} {options[option]}"
+            for option, action in (('ondelete', 'delete'), ('onupdate', 'update'))
+            if options.get(option)
+        )
+
+    def build_indexes(self):
+        """Add the deferred indexes in one table pass, then the foreign keys they back."""
+        shadow = self._quote(self.name)
+        with self.engine.begin() as connection:
+            if self.indexes:
+                connection.execute(text(f"ALTER TABLE {shadow} " + ', '.join(
+                    f"ADD {'UNIQUE ' if index['unique'] else ''}INDEX {self._quote(index['name'])} "
+                    f"({self._columns(index['column_names'])})"
+                    for index in self.indexes
+                )))
+            if self.foreign_keys:
+                # Left unnamed: <table>_shadow_ibfk_N becomes <table>_ibfk_N when the shadow is renamed
+                connection.execute(text(f"ALTER TABLE {shadow} " + ', '.join(
+                    f"ADD FOREIGN KEY ({self._columns(key['constrained_columns'])}) "
+                    f"REFERENCES {self._quote(key['referred_table'])} ({self._columns(key['referred_columns'])})"
+                    f"{self._actions(key)}"
+                    for key in self.foreign_keys
+                )))
+
+    def validate(self, loaded):
+        """Raise ValueError unless the shadow holds the `loaded` rows and is no smaller than the live table."""
+        with self.engine.connect() as connection:
+            shadow_rows = self._count(connection, self.name)
+            live_rows = (
+                self._count(connection, self.table_name)
+                if inspect(connection).has_table(self.table_name) else 0
+            )
+        if shadow_rows != loaded:
+            raise ValueError(f"{self.name} holds {shadow_rows} rows but {loaded} were loaded; not swapping it in.")
+        if shadow_rows < live_rows and not allow_shrink():
+            raise ValueError(
+                f"{self.name} holds {shadow_rows} rows, fewer than the {live_rows} in {self.table_name}; "
+                "not swapping it in (set ETL_SWAP_ALLOW_SHRINK=1 to allow it)."
+            )
+        print(f"{self.name} validated: {shadow_rows} rows ({self.table_name} had {live_rows}).")
+
+    def swap_in(self, loaded):
+        """Index and validate the shadow, then replace the live table with it in one RENAME."""
+        self.build_indexes()
+        self.validate(loaded)
+        live, shadow, retired = self._quote(self.table_name), self._quote(self.name), self._quote(self.retired_name)
+        with self.engine.begin() as connection:
+            if inspect(connection).has_table(self.table_name):
+                connection.execute(text(f"DROP TABLE IF EXISTS {retired}"))
+                # Both renames happen at once: no reader ever finds the table missing
+                connection.execute(text(f"RENAME TABLE {live} TO {retired}, {shadow} TO {live}"))
+                connection.execute(text(f"DROP TABLE {retired}"))
+            else:
+                connection.execute(text(f"RENAME TABLE {shadow} TO {live}"))
+        print(f"Swapped {self.name} in for {self.table_name}.")
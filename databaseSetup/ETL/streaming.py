@@ -0,0 +1,108 @@
+"""Bounded-memory reading of the paired offense/defense CSV exports.
+
+With no memory budget (ETL_MEMORY_MB unset) a stage gets each file whole, as before. With
+a budget, both files are streamed once with `chunksize` and spilled into hash partitions
+on the stage's key columns, so every row sharing a key lands in the same partition of
+both files. The stage then merges, cleans and loads one partition pair at a time, and
+peak memory follows the budget instead of the input size.
+"""
+import math
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+from pandas.api.types import is_numeric_dtype
+
+# Rough in-memory size of a CSV row as a DataFrame, merged and copied a few times over
+MEMORY_PER_CSV_BYTE = 8
+# Raw files use 'team'; stages merge on 'team_id'
+COLUMN_RENAMES = {'team': 'team_id'}
+# Rows parsed at a time when a row filter keeps only part of a file
+FILTER_CHUNK_ROWS = 100_000
+
+
+def memory_budget():
+    """Bytes one stage may hold at once, or None to read whole files."""
+    megabytes = os.getenv('ETL_MEMORY_MB')
+    return int(float(megabytes) * 1024 * 1024) if megabytes else None
+
+
+def _rows_per_chunk(path, budget):
+    with open(path, 'rb') as f:
+        sample = f.read(1 << 16)
+    lines = max(sample.count(b'\n') - 1, 1)
+    bytes_per_row = max(len(sample) // lines, 1)
+    return max(budget // (bytes_per_row * MEMORY_PER_CSV_BYTE), 1000)
+
+
+def _partition_of(chunk, keys, partitions):
+    # Numeric keys hash as floats, so 2023 in one file and 2023.0 in the other still meet
+    key_frame = pd.DataFrame({
+        key: chunk[key].astype('float64') if is_numeric_dtype(chunk[key]) else chunk[key].astype(str)
+        for key in keys
+    })
+    return pd.util.hash_pandas_object(key_frame, index=False).to_numpy() % partitions
+
+
+def _read_filtered(path, read_options, row_filter):
+    if row_filter is None:
+        return pd.read_csv(path, **read_options)
+    chunks = [
+        chunk[row_filter(chunk)]
+        for chunk in pd.read_csv(path, chunksize=FILTER_CHUNK_ROWS, **read_options)
+    ]
+    if not chunks:
+        return pd.read_csv(path, nrows=0, **read_options)
+    # Chunks with different categories concatenate as plain values; restore the categoricals
+    categorical = [col for col, dtype in read_options.get('dtype', {}).items() if dtype == 'category']
+    df = pd.concat(chunks, ignore_index=True)
+    return df.astype({col: 'category' for col in categorical if col in df.columns})
+
+
+def read_paired(offense_path, defense_path, partition_keys, read_options=None, row_filter=None):
+    """Yield (offense, defense) DataFrames whose rows agree on `partition_keys`.
+
+    `read_options` are extra read_csv arguments for the raw files (see dtypes.csv_dtypes).
+    `row_filter` maps a raw chunk to a boolean mask of the rows to keep, applied while
+    parsing so skipped rows are never held together (see watermarks.rows_since).
+    """
+    read_options = read_options or {}
+    budget = memory_budget()
+    total_bytes = os.path.getsize(offense_path) + os.path.getsize(defense_path)
+    if budget is None or total_bytes * MEMORY_PER_CSV_BYTE <= budget:
+        yield (_read_filtered(offense_path, read_options, row_filter),
+               _read_filtered(defense_path, read_options, row_filter))
+        return
+
+    partitions = math.ceil(total_bytes * MEMORY_PER_CSV_BYTE / budget)
+    spill_dir = tempfile.mkdtemp(prefix='etl_partitions_')
+    print(f"Streaming {total_bytes / 2**20:.1f} MB of CSV through {partitions} partitions "
+          f"({budget / 2**20:.1f} MB budget)")
+    try:
+        for side, path in (('off', offense_path), ('def', defense_path)):
+            written = set()
+            for chunk in pd.read_csv(path, chunksize=_rows_per_chunk(path, budget), **read_options):
+                if row_filter is not None:
+                    chunk = chunk[row_filter(chunk)]
+                chunk = chunk.rename(columns=COLUMN_RENAMES)
+                for partition, rows in chunk.groupby(_partition_of(chunk, partition_keys, partitions)):
+                    spill = os.path.join(spill_dir, f'{side}_{partition}.csv')
+                    rows.to_csv(spill, mode='a', header=partition not in written, index=False)
+                    written.add(partition)
+            # Partitions with no rows from this side still need the header for read_csv
+            header = pd.read_csv(path, nrows=0, usecols=read_options.get('usecols')).rename(columns=COLUMN_RENAMES)
+            for partition in set(range(partitions)) - written:
+                header.to_csv(os.path.join(spill_dir, f'{side}_{partition}.csv'), index=False)
+
+        # Spilled files carry the renamed headers
+        spill_dtype = {
+            COLUMN_RENAMES.get(name, name): dtype for name, dtype in read_options.get('dtype', {}).items()
+        }
+        for partition in range(partitions):
+            yield (
+                pd.read_csv(os.path.join(spill_dir, f'off_{partition}.csv'), dtype=spill_dtype),
+                pd.read_csv(os.path.join(spill_dir, f'def_{partition}.csv'), dtype=spill_dtype),
+            )
+    finally:
+        shutil.rmtree(spill_dir, ignore_errors=True)
@@ -0,0 +1,112 @@
+"""Per-table watermarks, so a run reads and loads only what the exports added since the last.
+
+A fact table's watermark is the latest (season, season_type, week) it has ingested, with
+no week for the yearly tables. Stages pass `rows_since(watermark)` to read_paired to
+drop older rows chunk by chunk while parsing. The watermark's own week (or season, for
+yearly tables) is read again because it may have been exported part-way through.
+The anti-join load skips its rows that are already in the table.
+Set ETL_FULL_RELOAD=1 (or pass --full) to ignore the watermarks.
+"""
+import os
+
+import numpy as np
+from sqlalchemy import text
+
+from backend.models.etl_watermarks import EtlWatermarks
+
+# Within a season, postseason follows the regular season
+SEASON_TYPES = ('REG', 'POST')
+
+
+class Watermark:
+    def __init__(self, season, season_type, week=None):
+        self.season = int(season)
+        self.season_type = season_type
+        self.week = None if week is None else int(week)
+
+    def key(self):
+        return (self.season, SEASON_TYPES.index(self.season_type), -1 if self.week is None else self.week)
+
+    def __repr__(self):
+        week = '' if self.week is None else f" week {self.week}"
+        return f"{self.season} {self.season_type}{week}"
+
+
+def full_reload():
+    return os.getenv('ETL_FULL_RELOAD', '0') == '1'
+
+
+def season_type_rank(values):
+    """0 for regular season, 1 for postseason, per row ('REG', 'Reg', 'regular', 'POST', ...)."""
+    labels = values.astype('category')
+    post = labels.cat.categories.astype(str).str.strip().str.lower().str.startswith('post')
+    # Missing labels (code -1) rank as regular season
+    return np.append(np.asarray(post, dtype=np.int8), 0)[labels.cat.codes.to_numpy()]
+
+
+def read_watermark(engine, table_name):
+    """The table's watermark, or None to read everything (first load or full reload)."""
+    if full_reload():
+        return None
+    EtlWatermarks.__table__.create(engine, checkfirst=True)
+    with engine.connect() as connection:
+        row = connection.execute(text(
+            "SELECT season, season_type, week FROM EtlWatermarks WHERE table_name = :table_name"
+        ), {"table_name": table_name}).first()
+    return Watermark(*row) if row else None
+
+
+def rows_since(watermark):
+    """read_paired row filter keeping rows at or after the watermark, or None to keep all."""
+    if watermark is None:
+        return None
+    season, rank = watermark.season, SEASON_TYPES.index(watermark.season_type)
+
+    def keep(chunk):
+        seasons = chunk['season'].astype('float64').to_numpy()
+        ranks = season_type_rank(chunk['season_type'])
+        if watermark.week is None:
+            same_slice = ranks >= rank
+        else:
+            weeks = chunk['week'].astype('float64').to_numpy()
+            same_slice = (ranks > rank) | ((ranks == rank) & (weeks >= watermark.week))
+        return (seasons > season) | ((seasons == season) & same_slice)
+
+    return keep
+
+
+def latest_in(*frames, has_week=True, latest=None):
+    """The newest (season, season_type[, week]) in the raw frames or `latest`, whichever is later."""
+    for df in frames:
+        if df.empty:
+            continue
+        seasons = df['season'].astype('float64').to_numpy()
+        ranks = season_type_rank(df['season_type'])
+        weeks = df['week'].astype('float64').to_numpy() if has_week else np.zeros(len(df))
+        order = np.lexsort((np.nan_to_num(weeks, nan=-1), ranks, np.nan_to_num(seasons, nan=-1)))
+        last = order[-1]
+        if np.isnan(seasons[last]):
+            continue
+        candidate = Watermark(seasons[last], SEASON_TYPES[ranks[last]], weeks[last] if has_week else None)
+        if latest is None or candidate.key() > latest.key():
+            latest = candidate
+    return latest
+
+
+def advance_watermark(engine, table_name, latest):
+    """Move the table's watermark forward to `latest`; never moves it back."""
+    if latest is None:
+        return
+    current = read_watermark(engine, table_name)
+    if current is not None and current.key() >= latest.key():
+        return
+    EtlWatermarks.__table__.create(engine, checkfirst=True)
+    with engine.begin() as connection:
+        connection.execute(text(
+            "INSERT INTO EtlWatermarks (table_name, season, season_type, week) "
+            "VALUES (:table_name, :season, :season_type, :week) "
+            "ON DUPLICATE KEY UPDATE season = VALUES(season), season_type = VALUES(season_type), "
+            "week = VALUES(week)"
+        ), {"table_name": table_name, "season": latest.season, "season_type": latest.season_type,
+            "week": latest.week})
+    print(f"{table_name} watermark now {latest}")
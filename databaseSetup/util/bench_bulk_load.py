@@ -0,0 +1,86 @@
+"""Time the ways a cleaned fact frame can reach the database.
+
+Transforms one fact stage's exports, then appends the result to a scratch table with
+pandas to_sql (the old path), batched executemany, and LOAD DATA LOCAL INFILE, and reports
+rows per second for each. LOAD DATA is skipped when the server refuses local infile. Uses
+the ETL database settings from .env. Run from the repository root:
+
+    python -m databaseSetup.util.bench_bulk_load [--stage TeamWeeklyStats] [--repeat 3]
+"""
+import argparse
+import contextlib
+import importlib
+import io
+import time
+
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+
+from databaseSetup.ETL.config import check_settings, data_file, get_engine
+from databaseSetup.ETL.loading import LOCAL_INFILE_REJECTED, insert_executemany, load_data_local_infile
+from databaseSetup.ETL.pipeline import STAGES
+from databaseSetup.ETL.streaming import read_paired
+
+FACT_FILES = {
+    'PlayerWeeklyStats': 'my_player_weekly_stats',
+    'PlayerYearlyStats': 'my_player_yearly_stats',
+    'TeamWeeklyStats': 'my_team_weekly_stats',
+    'TeamYearlyStats': 'my_team_yearly_stats',
+}
+
+
+def to_sql(connection, table_name, df):
+    df.to_sql(table_name, con=connection, if_exists='append', index=False, chunksize=1000)
+    return len(df)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--stage', choices=sorted(FACT_FILES), default='TeamWeeklyStats')
+    parser.add_argument('--repeat', type=int, default=3, help='runs per timing; the best is kept')
+    args = parser.parse_args()
+
+    check_settings()
+    stage = importlib.import_module(f'databaseSetup.ETL.{STAGES[args.stage].module}')
+    prefix = FACT_FILES[args.stage]
+    with contextlib.redirect_stdout(io.StringIO()):
+        df = stage.transform(*next(read_paired(
+            data_file(f'{prefix}_offense.csv'), data_file(f'{prefix}_defense.csv'),
+            stage.PARTITION_KEYS, stage.READ_OPTIONS,
+        )))
+
+    engine = get_engine()
+    scratch = f'bench_bulk_{args.stage}'
+    quote = engine.dialect.identifier_preparer.quote
+    print(f"{args.stage}: {len(df)} rows x {len(df.columns)} columns into {scratch}")
+    print(f"{'path':<24} {'best s':>8} {'rows/s':>10}")
+    try:
+        for name, load in (('to_sql (chunksize=1000)', to_sql),
+                           ('executemany', insert_executemany),
+                           ('LOAD DATA LOCAL INFILE', load_data_local_infile)):
+            if load is load_data_local_infile and engine.dialect.name != 'mysql':
+                print(f"{name:<24} skipped: {engine.dialect.name} has no LOAD DATA")
+                continue
+            timings = []
+            for _ in range(args.repeat):
+                with engine.begin() as connection:
+                    df.head(0).to_sql(scratch, con=connection, if_exists='replace', index=False)
+                start = time.perf_counter()
+                try:
+                    with engine.begin() as connection:
+                        load(connection, scratch, df)
+                except DBAPIError as e:
+                    if not e.orig.args or e.orig.args[0] not in LOCAL_INFILE_REJECTED:
+                        raise
+                    print(f"{name:<24} skipped: server refused local infile ({e.orig.args[0]})")
+                    break
+                timings.append(time.perf_counter() - start)
+            if timings:
+                print(f"{name:<24} {min(timings):>8.3f} {len(df) / min(timings):>10.0f}")
+    finally:
+        with engine.begin() as connection:
+            connection.execute(text(f"DROP TABLE IF EXISTS {quote(scratch)}"))
+
+
+if __name__ == "__main__":
+    main()
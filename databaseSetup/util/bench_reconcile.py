@@ -0,0 +1,112 @@
+"""Time the offense/defense merge reconciliation: row-wise/per-column vs vectorized.
+
+Merges each weekly export pair the way the fact stages do, but with season_type left out
+of the join so both the season_type resolution and the shared-stat folding have `_x`/`_y`
+pairs to work on, then times the old loops against databaseSetup.ETL.reconcile and checks
+they agree. Run from the repository root:
+
+    python -m databaseSetup.util.bench_reconcile [--repeat 5]
+"""
+import argparse
+import os
+import time
+
+import pandas as pd
+
+from databaseSetup.ETL import etl_PlayerWeeklyStats, etl_TeamWeeklyStats
+from databaseSetup.ETL.config import data_file
+from databaseSetup.ETL.reconcile import combine_shared, resolve_season_type
+
+WEEKLY_FILES = [
+    ('PlayerWeeklyStats', etl_PlayerWeeklyStats, 'my_player_weekly_stats', ['player_id', 'team_id', 'season', 'week']),
+    ('TeamWeeklyStats', etl_TeamWeeklyStats, 'my_team_weekly_stats', ['game_id', 'team_id', 'season', 'week']),
+]
+
+
+def legacy_resolve_season_type(df):
+    df = df.copy()
+    df['season_type_x'] = df['season_type_x'].astype(object).fillna('')
+    df['season_type_y'] = df['season_type_y'].astype(object).fillna('')
+
+    def resolve(row):
+        off_type = str(row['season_type_x']).strip().lower()
+        def_type = str(row['season_type_y']).strip().lower()
+        if 'regular' in [off_type, def_type]:
+            return 'Reg'
+        elif 'postseason' in [off_type, def_type]:
+            return 'Post'
+        elif off_type:
+            return off_type.capitalize()
+        elif def_type:
+            return def_type.capitalize()
+        return 'Unknown'
+
+    df['season_type'] = df.apply(resolve, axis=1)
+    df.drop(columns=['season_type_x', 'season_type_y'], inplace=True)
+    return df
+
+
+def legacy_combine_shared(df, names):
+    df = df.copy()
+    for stat_name in names:
+        off_col = f"{stat_name}_x"
+        def_col = f"{stat_name}_y"
+        if off_col in df.columns and def_col in df.columns:
+            if pd.api.types.is_numeric_dtype(df[off_col]) or pd.api.types.is_numeric_dtype(df[def_col]):
+                df[stat_name] = df[off_col].fillna(0) + df[def_col].fillna(0)
+            else:
+                df[stat_name] = df[off_col].fillna(df[def_col])
+            df.drop(columns=[off_col, def_col], inplace=True)
+        elif off_col in df.columns:
+            df.rename(columns={off_col: stat_name}, inplace=True)
+        elif def_col in df.columns:
+            df.rename(columns={def_col: stat_name}, inplace=True)
+    return df
+
+
+def best_of(repeat, func, *args):
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+def same(left, right):
+    try:
+        pd.testing.assert_frame_equal(left, right[left.columns], check_dtype=False)
+    except AssertionError:
+        return False
+    return True
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help='runs per timing; the best is kept')
+    args = parser.parse_args()
+
+    print(f"{'file':<20} {'rows':>8} {'step':<14} {'legacy s':>9} {'vector s':>9} {'speedup':>8}  match")
+    for name, stage, prefix, merge_keys in WEEKLY_FILES:
+        offense_path, defense_path = data_file(f'{prefix}_offense.csv'), data_file(f'{prefix}_defense.csv')
+        if not (os.path.exists(offense_path) and os.path.exists(defense_path)):
+            print(f"{name:<20} skipped: {prefix}_*.csv not in the data directory")
+            continue
+        offense = pd.read_csv(offense_path, **stage.READ_OPTIONS).rename(columns={'team': 'team_id'})
+        defense = pd.read_csv(defense_path, **stage.READ_OPTIONS).rename(columns={'team': 'team_id'})
+        merged = pd.merge(offense, defense, on=merge_keys, how='outer')
+        shared = sorted((set(offense.columns) & set(defense.columns)) - set(merge_keys) - {'season_type'})
+
+        steps = [
+            ('season_type', legacy_resolve_season_type, resolve_season_type, (merged,)),
+            ('shared stats', legacy_combine_shared, combine_shared, (merged, shared)),
+        ]
+        for step, legacy, vectorized, step_args in steps:
+            legacy_seconds, expected = best_of(args.repeat, legacy, *step_args)
+            vector_seconds, result = best_of(args.repeat, vectorized, *step_args)
+            print(f"{name:<20} {len(merged):>8} {step:<14} {legacy_seconds:>9.4f} {vector_seconds:>9.4f} "
+                  f"{legacy_seconds / vector_seconds:>7.1f}x  {same(expected, result)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""Create the secondary indexes declared on the ORM models, skipping ones that exist.
+
+Tables are created by the ETL scripts, so indexes added to the models later are applied
+here. Run from the repository root:
+
+    python -m databaseSetup.util.create_indexes
+"""
+from sqlalchemy import inspect
+
+from backend.db import Base, engine
+import backend.models.defense_vs_position  # noqa: F401 (registers the tables on Base.metadata)
+import backend.models.dim_players  # noqa: F401
+import backend.models.dim_teams  # noqa: F401
+import backend.models.player_weekly_stats  # noqa: F401
+import backend.models.team_weekly_stats  # noqa: F401
+
+
+def main():
+    tables = inspect(engine)
+    for table in Base.metadata.sorted_tables:
+        if not table.indexes:
+            continue
+        if not tables.has_table(table.name):
+            print(f"Skipped {table.name}: table does not exist yet")
+            continue
+        existing = {index["name"] for index in tables.get_indexes(table.name)}
+        for index in sorted(table.indexes, key=lambda index: index.name):
+            columns = ', '.join(column.name for column in index.columns)
+            if index.name in existing:
+                print(f"Exists  {table.name}: {index.name} ({columns})")
+                continue
+            index.create(engine)
+            print(f"Created {table.name}: {index.name} ({columns})")
+
+if __name__ == "__main__":
+    main()